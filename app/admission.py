@@ -0,0 +1,165 @@
+"""Admission control for database-bound routes.
+
+Without it every request is accepted and then waits, invisibly, for a pooled
+connection until ``pool_timeout``. ``AdmissionController`` lets ``limit``
+requests run and parks the rest in a bounded queue with a deadline; anything
+beyond that is answered 503 with ``Retry-After`` straight away. Routes opt in
+through ``AdmissionRoute``.
+"""
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+
+from app import metrics
+from app.responses import FastJSONResponse
+from app.settings import admission_settings, database_settings
+
+READ = "read"
+WRITE = "write"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, prioritized wait queue.
+
+    A released slot goes to the oldest queued write before any queued read,
+    and a write that finds the queue full takes the place of the newest
+    queued read, so a flood of reads cannot hold writes back. Waiters give up
+    after ``timeout`` seconds.
+    """
+
+    def __init__(self, limit: int, queue_size: int = 100, timeout: float = 2):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._queues: Dict[str, deque] = {WRITE: deque(), READ: deque()}
+
+    @property
+    def queued(self) -> int:
+        return len(self._queues[WRITE]) + len(self._queues[READ])
+
+    async def acquire(self, priority: str = READ) -> None:
+        if self.active < self.limit:
+            self.active += 1
+            return
+        if self.queued >= self.queue_size:
+            if priority != WRITE or not self._queues[READ]:
+                raise Overloaded("queue_full")
+            self._queues[READ].pop().set_exception(Overloaded("evicted"))
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[priority]
+        queue.append(future)
+        try:
+            await asyncio.wait({future}, timeout=self.timeout)
+        except asyncio.CancelledError:
+            self._abandon(queue, future)
+            raise
+        if not future.done():
+            self._abandon(queue, future)
+            raise Overloaded("timeout")
+        future.result()
+
+    def _abandon(self, queue: deque, future: asyncio.Future) -> None:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            # The slot was handed over just as we gave up; pass it on.
+            self.release()
+            return
+        future.cancel()
+        if future in queue:
+            queue.remove(future)
+
+    def release(self) -> None:
+        for queue in (self._queues[WRITE], self._queues[READ]):
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "active": self.active, "queued": self.queued, "queue_size": self.queue_size}
+
+
+def overloaded_response() -> Response:
+    return FastJSONResponse({"detail": "Server is overloaded, retry later"},
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={"Retry-After": str(admission_settings.retry_after)})
+
+
+async def _release_after(body: AsyncIterator, gates: List[AdmissionController]) -> AsyncIterator:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        for gate in reversed(gates):
+            gate.release()
+
+
+def make_controller(limit: int) -> AdmissionController:
+    return AdmissionController(limit, admission_settings.queue_size, admission_settings.queue_timeout)
+
+
+class AdmissionRoute(APIRoute):
+    """Route that admits requests through ``controller`` (shared by the routes
+    of a router) and, when ``ADMISSION_ROUTE_LIMITS`` names it, a controller
+    of its own. Streaming responses keep their slots until the body is sent.
+    """
+
+    controller: Optional[AdmissionController] = None
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not admission_settings.enabled:
+            return handler
+        limits = [admission_settings.route_limits.get(f"{method} {self.path}") for method in self.methods]
+        route_limit = min(filter(None, limits), default=None)
+        gates = [make_controller(route_limit)] if route_limit else []
+        if self.controller is not None:
+            gates.append(self.controller)
+        if not gates:
+            return handler
+        priority = WRITE if self.methods & WRITE_METHODS else READ
+        path = self.path
+
+        async def admitted(request: Request) -> Response:
+            acquired = []
+            try:
+                for gate in gates:
+                    await gate.acquire(priority)
+                    acquired.append(gate)
+            except BaseException as e:
+                for gate in reversed(acquired):
+                    gate.release()
+                if not isinstance(e, Overloaded):
+                    raise
+                metrics.http_requests_shed.inc(route=path, reason=e.reason)
+                return overloaded_response()
+            streaming = False
+            try:
+                response = await handler(request)
+                if isinstance(response, StreamingResponse):
+                    response.body_iterator = _release_after(response.body_iterator, gates)
+                    streaming = True
+                return response
+            finally:
+                if not streaming:
+                    for gate in reversed(gates):
+                        gate.release()
+
+        return admitted
+
+
+users_controller = make_controller(admission_settings.limit
+                                   or database_settings.pool_size + database_settings.max_overflow)
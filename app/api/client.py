@@ -1,19 +1,114 @@
-from typing import Optional, TypeVar, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterable, List, Optional, TypeVar, Any
 import requests
-from requests import Session
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
 from fastapi import HTTPException
 from voluptuous import Schema
 
 T = TypeVar('T')
 
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+
+TimingHook = Callable[[str, str, Optional[int], float, int], None]
+
+
+def build_session(pool_size: int = 10) -> Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def retry_after(response: Response) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP-date), or ``None``."""
+    value = response.headers.get("Retry-After")
+    if response.status_code not in RETRY_AFTER_STATUSES or not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def send_with_retry(
+        session: Session,
+        method: str,
+        url: str,
+        *,
+        retries: int = 3,
+        backoff: float = 0.1,
+        max_retry_after: float = 30,
+        on_timing: Optional[TimingHook] = None,
+        **kwargs
+) -> Response:
+    """Send a request, retrying idempotent methods on connection errors and
+    429/5xx gateway statuses with full-jitter exponential backoff.
+
+    A ``Retry-After`` on 429/503 replaces the backoff for that attempt; when it
+    asks for more than ``max_retry_after`` seconds the response is returned
+    instead of waiting.
+
+    ``on_timing(method, url, status_code, seconds, attempt)`` is called for
+    every attempt; ``status_code`` is ``None`` when the attempt raised.
+    """
+    attempts = retries + 1 if method.upper() in IDEMPOTENT_METHODS else 1
+    for attempt in range(attempts):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if on_timing:
+                on_timing(method, url, None, time.perf_counter() - started, attempt)
+            if attempt == attempts - 1:
+                raise
+        else:
+            if on_timing:
+                on_timing(method, url, response.status_code, time.perf_counter() - started, attempt)
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+            delay = retry_after(response)
+            if delay is not None:
+                if delay > max_retry_after:
+                    return response
+                response.close()
+                time.sleep(delay)
+                continue
+            response.close()
+        time.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+
+def map_concurrently(fn: Callable[[Any], T], items: Iterable[Any], max_workers: int) -> List[T]:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fn, items))
+
 
 class ApiClient:
-    def __init__(self, environment: str = "development"):
+    def __init__(self, environment: str = "development", *, pool_size: int = 10, retries: int = 3,
+                 backoff: float = 0.1, on_timing: Optional[TimingHook] = None):
         self.environment = environment
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff = backoff
+        self.on_timing = on_timing
         self.session = self._init_session()
 
     def _init_session(self) -> Session:
-        session = requests.Session()
+        session = build_session(self.pool_size)
         session.headers.update({
             "Content-Type": "application/json",
             "Accept": "application/json"
@@ -46,7 +141,8 @@ class ApiClient:
         if request_schema and 'json' in kwargs:
             kwargs['json'] = self._validate_input(kwargs['json'], request_schema)
 
-        response = self.session.request(method, url, **kwargs)
+        response = send_with_retry(self.session, method, url, retries=self.retries, backoff=self.backoff,
+                                   on_timing=self.on_timing, **kwargs)
 
         if response.status_code != expected_status:
             raise HTTPException(
@@ -54,4 +150,16 @@ class ApiClient:
                 detail=f"Expected status {expected_status}, got {response.status_code}"
             )
 
-        return response.json() if response.content else None
\ No newline at end of file
+        return response.json() if response.content else None
+
+    def get(self, endpoint: str, **kwargs) -> Any:
+        return self._request("GET", endpoint, **kwargs)
+
+    def post(self, endpoint: str, **kwargs) -> Any:
+        return self._request("POST", endpoint, expected_status=kwargs.pop("expected_status", 201), **kwargs)
+
+    def patch(self, endpoint: str, **kwargs) -> Any:
+        return self._request("PATCH", endpoint, **kwargs)
+
+    def delete(self, endpoint: str, **kwargs) -> Any:
+        return self._request("DELETE", endpoint, expected_status=kwargs.pop("expected_status", 204), **kwargs)
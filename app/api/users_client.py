@@ -1,6 +1,34 @@
+import csv
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
 import requests
-from typing import Dict, Any
-from voluptuous import Schema, All, Length, PREVENT_EXTRA
+from voluptuous import Schema, All, Length
+
+from app.api.client import TimingHook, build_session, map_concurrently, send_with_retry
+from app.schemas import validation
+
+# Схемы компилируются один раз на процесс и общие для всех клиентов
+USER_SCHEMA = validation.user
+USER_LIST_SCHEMA = validation.ListValidator(
+    Schema(
+        {
+            "page": int,
+            "per_page": int,
+            "total": int,
+            "total_pages": int,
+            "data": All([USER_SCHEMA], Length(min=1)),
+            "support": {
+                "url": str,
+                "text": str
+            }
+        }
+    ),
+    validation.users,
+    min_items=1,
+)
 
 
 def _validate(data: Dict[str, Any], schema: Schema) -> Dict[str, Any]:
@@ -8,54 +36,184 @@ def _validate(data: Dict[str, Any], schema: Schema) -> Dict[str, Any]:
     return schema(data)
 
 
+def _parse_events(lines: Iterator[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Разбор потока text/event-stream на пары (event, data)"""
+    name, data = "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield name, json.loads("\n".join(data))
+            name, data = "message", []
+        elif line.startswith("event:"):
+            name = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].lstrip())
+
+
 class UserApiClient:
-    def __init__(self, base_url: str):
+    batch_query_limit = 100
+    _user_schema = USER_SCHEMA
+    _user_list_schema = USER_LIST_SCHEMA
+
+    def __init__(self, base_url: str, *, pool_size: int = 10, max_workers: int = 10, retries: int = 3,
+                 backoff: float = 0.1, on_timing: Optional[TimingHook] = None, etag_cache_size: int = 256):
         self.base_url = base_url
-        self.session = requests.Session()
-
-        # Схемы валидации
-        self._user_schema = Schema(
-            {
-                "id": int,
-                "email": str,
-                "first_name": str,
-                "last_name": str,
-                "avatar": str
-            },
-            extra=PREVENT_EXTRA,
-            required=True
-        )
-
-        self._user_list_schema = Schema(
-            {
-                "page": int,
-                "per_page": int,
-                "total": int,
-                "total_pages": int,
-                "data": All([self._user_schema], Length(min=1)),
-                "support": {
-                    "url": str,
-                    "text": str
-                }
-            }
-        )
+        self.session = build_session(pool_size)
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.on_timing = on_timing
+        # Кэш условных GET: URL -> (ETag, тело ответа); тело хранится в байтах,
+        # чтобы вызывающий код не мог изменить закэшированные данные
+        self.etag_cache_size = etag_cache_size
+        self.not_modified = 0
+        self._etag_cache: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._etag_lock = threading.Lock()
+
+    def _send(self, method: str, url: str, **kwargs):
+        return send_with_retry(self.session, method, url, retries=self.retries, backoff=self.backoff,
+                               on_timing=self.on_timing, **kwargs)
+
+    def _cache_key(self, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return requests.Request("GET", url, params=params).prepare().url
+
+    def _remember(self, key: str, response) -> None:
+        etag = response.headers.get("ETag")
+        if not etag or not self.etag_cache_size:
+            return
+        with self._etag_lock:
+            self._etag_cache[key] = (etag, response.content)
+            self._etag_cache.move_to_end(key)
+            while len(self._etag_cache) > self.etag_cache_size:
+                self._etag_cache.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        with self._etag_lock:
+            self._etag_cache.pop(key, None)
+
+    def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None):
+        """GET с If-None-Match: на 304 тело берется из кэша"""
+        key = self._cache_key(url, params)
+        with self._etag_lock:
+            cached = self._etag_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self._send("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            with self._etag_lock:
+                self.not_modified += 1
+                if key in self._etag_cache:
+                    self._etag_cache.move_to_end(key)
+            return json.loads(cached[1])
+        response.raise_for_status()
+        self._remember(key, response)
+        return response.json()
+
+    def cached_etag(self, user_id: int) -> Optional[str]:
+        """ETag последней полученной версии пользователя, для If-Match"""
+        with self._etag_lock:
+            cached = self._etag_cache.get(self._cache_key(f"{self.base_url}/api/users/{user_id}"))
+        return cached[0] if cached else None
 
     def create_user(self, user_data: dict):
-        response = self.session.post(f"{self.base_url}/api/users/", json=user_data)
+        response = self._send("POST", f"{self.base_url}/api/users/", json=user_data)
         response.raise_for_status()
         return response.json()
 
     def get_user(self, user_id: int):
-        response = self.session.get(f"{self.base_url}/api/users/{user_id}")
+        return self._get_json(f"{self.base_url}/api/users/{user_id}")
+
+    def list_users(self, **params):
+        return self._get_json(f"{self.base_url}/api/users/", params=params)
+
+    def get_users_many(self, user_ids: List[int]):
+        if len(user_ids) <= self.batch_query_limit:
+            response = self._send("GET", f"{self.base_url}/api/users/batch",
+                                  params={"ids": ",".join(map(str, user_ids))})
+        else:
+            response = self._send("POST", f"{self.base_url}/api/users/batch", json=user_ids)
         response.raise_for_status()
         return response.json()
 
-    def update_user(self, user_id: int, user_data: dict):
-        response = self.session.patch(f"{self.base_url}/api/users/{user_id}", json=user_data)
+    def export_users(self, export_format: str = "ndjson") -> Iterator[Dict[str, Any]]:
+        with self._send("GET", f"{self.base_url}/api/users/export", params={"format": export_format},
+                        stream=True) as response:
+            response.raise_for_status()
+            lines = (line.decode("utf-8") for line in response.iter_lines())
+            if export_format == "csv":
+                yield from csv.DictReader(lines)
+            else:
+                yield from (json.loads(line) for line in lines if line)
+
+    def subscribe_changes(self, last_event_id: Optional[int] = None, idle_timeout: Optional[float] = None,
+                          reconnect: bool = True) -> Iterator[Dict[str, Any]]:
+        """Генератор событий ленты изменений: created/updated/deleted и reset.
+
+        После reset закэшированные данные нужно перечитать. При переполнении
+        очереди или обрыве соединения подписка возобновляется с последнего
+        полученного id. С idle_timeout лента закрывается после простоя.
+        """
+        while True:
+            headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+            params = {"idle_timeout": idle_timeout} if idle_timeout is not None else {}
+            overflowed = connected = False
+            try:
+                with self._send("GET", f"{self.base_url}/api/users/changes", headers=headers, params=params,
+                                stream=True) as response:
+                    response.raise_for_status()
+                    connected = True
+                    if last_event_id is None:
+                        last_event_id = int(response.headers["X-Last-Event-ID"])
+                    for name, data in _parse_events(response.iter_lines(decode_unicode=True)):
+                        if name == "overflow":
+                            overflowed = True
+                        elif name == "reset":
+                            yield {"type": "reset", **data}
+                        else:
+                            last_event_id = data["id"]
+                            yield data
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+                # Обрыв уже установленного соединения; ошибки подключения повторяет _send
+                if not (reconnect and connected):
+                    raise
+                continue
+            if not (overflowed and reconnect):
+                return
+
+    def update_user(self, user_id: int, user_data: dict, if_match: Optional[str] = None):
+        url = f"{self.base_url}/api/users/{user_id}"
+        headers = {"If-Match": if_match} if if_match else {}
+        response = self._send("PATCH", url, json=user_data, headers=headers)
         response.raise_for_status()
+        # Ответ на PATCH - новая версия пользователя со своим ETag
+        self._remember(self._cache_key(url), response)
         return response.json()
 
-    def delete_user(self, user_id: int):
-        response = self.session.delete(f"{self.base_url}/api/users/{user_id}")
+    def delete_user(self, user_id: int, if_match: Optional[str] = None):
+        url = f"{self.base_url}/api/users/{user_id}"
+        headers = {"If-Match": if_match} if if_match else {}
+        response = self._send("DELETE", url, headers=headers)
+        response.raise_for_status()
+        self._forget(self._cache_key(url))
+        return response.status_code
+
+    def create_users(self, users_data: List[dict], errors: str = "abort"):
+        response = self._send("POST", f"{self.base_url}/api/users/bulk", json=users_data, params={"errors": errors})
         response.raise_for_status()
-        return response.status_code
\ No newline at end of file
+        return response.json()
+
+    def delete_users(self, user_ids: List[int]):
+        response = self._send("DELETE", f"{self.base_url}/api/users/bulk", json=user_ids)
+        response.raise_for_status()
+        return response.json()
+
+    def get_users_concurrently(self, user_ids: List[int]) -> List[Dict[str, Any]]:
+        return map_concurrently(self.get_user, user_ids, self.max_workers)
+
+    def create_users_concurrently(self, users_data: List[dict]) -> List[Dict[str, Any]]:
+        return map_concurrently(self.create_user, users_data, self.max_workers)
+
+    def update_users_concurrently(self, updates: Dict[int, dict]) -> List[Dict[str, Any]]:
+        return map_concurrently(lambda item: self.update_user(*item), updates.items(), self.max_workers)
+
+    def delete_users_concurrently(self, user_ids: List[int]) -> List[int]:
+        return map_concurrently(self.delete_user, user_ids, self.max_workers)
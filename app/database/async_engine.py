@@ -0,0 +1,49 @@
+import itertools
+import os
+from typing import List, Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database.engine import engine_options, primary_only
+from app.metrics import instrument_engine
+from app.profiling import profile_engine
+from app.settings import database_settings
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_url(url: str) -> str:
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(
+        hide_password=False)
+
+def make_async_engine(url: str, name: str = "async") -> AsyncEngine:
+    new_engine = create_async_engine(url, **engine_options(url))
+    instrument_engine(new_engine.sync_engine, name)
+    profile_engine(new_engine.sync_engine)
+    return new_engine
+
+async_engine = make_async_engine(database_settings.async_engine or async_url(database_settings.engine))
+async_replica_engines: List[AsyncEngine] = [make_async_engine(async_url(url), f"async_replica{i}")
+                                            for i, url in enumerate(database_settings.replicas, 1)]
+_replicas = itertools.cycle(async_replica_engines)
+async_session = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+async def dispose_async_engines() -> None:
+    for pooled in (async_engine, *async_replica_engines):
+        await pooled.dispose()
+
+def _dispose_after_fork() -> None:
+    # Same as the sync engines: the child starts with empty pools of its own.
+    for pooled in (async_engine, *async_replica_engines):
+        pooled.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
+
+def read_async_engine() -> Optional[AsyncEngine]:
+    if async_replica_engines and not primary_only():
+        return next(_replicas)
+    return None
@@ -0,0 +1,203 @@
+from typing import Any, AsyncIterator, Collection, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from fastapi_pagination import Params
+from sqlalchemy import Row, delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import cache, changes
+from app.database.async_engine import async_engine, async_session, read_async_engine
+from app.database.coalescer import AsyncWriteCoalescer
+from app.database.engine import mark_write
+from app.database.users import (BULK_CHUNK_SIZE, EXPORT_BATCH_SIZE, VersionMismatch, check_version, claim_emails,
+                                created_changes, filter_users, group_result, page_result, row_dicts, select_columns,
+                                sort_users, update_values, versioned_query)
+from app.models.User import User, UserCreate, UserFilter, UserUpdate, VersionedUser
+from app.settings import database_settings
+
+def _read_session() -> AsyncSession:
+    replica = read_async_engine()
+    return async_session(bind=replica) if replica is not None else async_session()
+
+async def _load_user(user_id: int) -> Optional[VersionedUser]:
+    async with _read_session() as session:
+        user = await session.get(User, user_id)
+        return VersionedUser.model_validate(user) if user else None
+
+async def get_user(user_id: int) -> Optional[VersionedUser]:
+    return await cache.user_cache.aget_or_load(user_id, lambda: _load_user(user_id))
+
+async def get_user_fields(user_id: int, fields: Sequence[str]) -> Optional[Tuple[Dict[str, Any], int]]:
+    async with _read_session() as session:
+        row = (await session.exec(select_columns(fields, versions=True).where(User.id == user_id))).first()
+        return (row_dicts([row], versions=True)[0], row.etag_version) if row else None
+
+async def get_users_page_rows(params: Params, user_filter: Optional[UserFilter] = None,
+                              fields: Optional[Sequence[str]] = None, versions: bool = False
+                              ) -> Tuple[List[Row], int]:
+    async with _read_session() as session:
+        query = filter_users(select_columns(fields, versions), user_filter, session.bind.dialect)
+        total = (await session.exec(select(func.count()).select_from(query.subquery()))).one()
+        query = sort_users(query, user_filter).offset((params.page - 1) * params.size).limit(params.size)
+        return (await session.exec(query)).all(), total
+
+async def get_users_page(params: Params, user_filter: Optional[UserFilter] = None,
+                         fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    rows, total = await get_users_page_rows(params, user_filter, fields)
+    return page_result(rows, total, params)
+
+async def get_users_after(cursor: Optional[int], limit: int, user_filter: Optional[UserFilter] = None,
+                          fields: Optional[Sequence[str]] = None, versions: bool = False) -> Iterable[Row]:
+    query = select_columns(fields, versions).order_by(User.id).limit(limit)
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+    async with _read_session() as session:
+        return (await session.exec(filter_users(query, user_filter, session.bind.dialect))).all()
+
+async def iter_user_batches(batch_size: int = EXPORT_BATCH_SIZE,
+                            fields: Optional[Sequence[str]] = None) -> AsyncIterator[List[Dict]]:
+    query = select_columns(fields).order_by(User.id)
+    async with (read_async_engine() or async_engine).connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=batch_size))
+        async for batch in result.mappings().partitions():
+            yield [dict(row) for row in batch]
+
+async def get_users_by_ids(user_ids: List[int], chunk_size: int = BULK_CHUNK_SIZE) -> List[Row]:
+    unique_ids = list(dict.fromkeys(user_ids))
+    users = []
+    async with _read_session() as session:
+        for start in range(0, len(unique_ids), chunk_size):
+            query = select_columns().where(User.id.in_(unique_ids[start:start + chunk_size]))
+            users.extend((await session.exec(query)).all())
+    return users
+
+async def _insert_user(session: AsyncSession, values: Dict[str, Any]) -> Dict[str, Any]:
+    if session.bind.dialect.insert_returning:
+        return dict((await session.exec(insert(User).values(**values).returning(*User.__table__.c))).mappings().one())
+    result = await session.exec(insert(User).values(**values))
+    return {**values, "id": result.inserted_primary_key[0], "version": 1}
+
+async def _create_user(user_create: UserCreate) -> VersionedUser:
+    async with async_session() as session:
+        row = await _insert_user(session, user_create.model_dump())
+        await session.commit()
+    response = VersionedUser.model_validate(row)
+    await changes.change_bus.apublish(changes.CREATED, response.id, response.model_dump())
+    return response
+
+async def create_user_group(users_create: List[UserCreate]) -> List[Union[VersionedUser, Exception]]:
+    if len(users_create) == 1:
+        try:
+            return [await _create_user(users_create[0])]
+        except Exception as e:
+            return [e]
+    rows = [user_create.model_dump() for user_create in users_create]
+    try:
+        async with async_session() as session:
+            query = select(User.email).where(User.email.in_({row["email"] for row in rows}))
+            conflicts = claim_emails(rows, (await session.exec(query)).all())
+            fresh = [row for row, conflict in zip(rows, conflicts) if conflict is None]
+            if fresh and session.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+                query = insert(User).returning(*User.__table__.c, sort_by_parameter_order=True)
+                inserted = [dict(row) for row in (await session.exec(query, params=fresh)).mappings()]
+            else:
+                inserted = [await _insert_user(session, row) for row in fresh]
+            await session.commit()
+    except IntegrityError:
+        outcomes = []
+        for user_create in users_create:
+            try:
+                outcomes.append(await _create_user(user_create))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    outcomes = group_result(conflicts, inserted)
+    await changes.change_bus.apublish_many(changes.CREATED, created_changes(outcomes))
+    return outcomes
+
+create_coalescer: Optional[AsyncWriteCoalescer] = None
+if database_settings.coalesce_window_ms:
+    create_coalescer = AsyncWriteCoalescer(create_user_group, database_settings.coalesce_max_batch,
+                                           database_settings.coalesce_window_ms / 1000)
+
+async def create_user(user_create: UserCreate) -> VersionedUser:
+    mark_write()
+    if create_coalescer is not None:
+        return await create_coalescer.submit(user_create)
+    return await _create_user(user_create)
+
+async def update_user(user_id: int, user_update: UserUpdate,
+                      versions: Optional[Collection[int]] = None) -> Optional[VersionedUser]:
+    values = update_values(user_update)
+    if not values:
+        return check_version(user_id, await get_user(user_id), versions)
+    mark_write()
+    async with async_session() as session:
+        query = versioned_query(update(User), user_id, versions).values(**values, version=User.version + 1)
+        if session.bind.dialect.update_returning:
+            row = (await session.exec(query.returning(*User.__table__.c))).mappings().one_or_none()
+            row = dict(row) if row else None
+        else:
+            result = await session.exec(query)
+            row = await session.get(User, user_id) if result.rowcount else None
+        response = VersionedUser.model_validate(row) if row else None
+        await session.commit()
+    # Invalidate rather than store: a slower concurrent write could otherwise cache an older version.
+    cache.user_cache.delete(user_id)
+    if response:
+        await changes.change_bus.apublish(changes.UPDATED, user_id, response.model_dump())
+    if response is None and versions is not None:
+        raise VersionMismatch(user_id)
+    return response
+
+async def delete_user(user_id: int, versions: Optional[Collection[int]] = None) -> bool:
+    mark_write()
+    async with async_session() as session:
+        query = versioned_query(delete(User), user_id, versions)
+        if session.bind.dialect.delete_returning:
+            deleted = (await session.exec(query.returning(User.id))).scalar_one_or_none() is not None
+        else:
+            deleted = (await session.exec(query)).rowcount > 0
+        await session.commit()
+    cache.user_cache.delete(user_id)
+    if deleted:
+        await changes.change_bus.apublish(changes.DELETED, user_id)
+    elif versions is not None:
+        raise VersionMismatch(user_id)
+    return deleted
+
+async def create_users(users_create: List[UserCreate], chunk_size: int = BULK_CHUNK_SIZE) -> List[int]:
+    rows = [user_create.model_dump() for user_create in users_create]
+    ids = []
+    mark_write()
+    async with async_session() as session:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if session.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+                query = insert(User).returning(User.id, sort_by_parameter_order=True)
+                ids.extend((await session.exec(query, params=chunk)).scalars().all())
+            else:
+                for row in chunk:
+                    ids.append((await session.exec(insert(User).values(**row))).inserted_primary_key[0])
+        await session.commit()
+    await changes.change_bus.apublish_many(changes.CREATED, [(user_id, {"id": user_id, **row, "version": 1})
+                                                             for user_id, row in zip(ids, rows)])
+    return ids
+
+async def delete_users(user_ids: List[int], chunk_size: int = BULK_CHUNK_SIZE) -> List[int]:
+    deleted = []
+    mark_write()
+    async with async_session() as session:
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            query = delete(User).where(User.id.in_(chunk))
+            if session.bind.dialect.delete_returning:
+                deleted.extend((await session.exec(query.returning(User.id))).scalars().all())
+            else:
+                deleted.extend((await session.exec(select(User.id).where(User.id.in_(chunk)))).all())
+                await session.exec(query)
+        await session.commit()
+    for user_id in deleted:
+        cache.user_cache.delete(user_id)
+    await changes.change_bus.apublish_many(changes.DELETED, [(user_id, None) for user_id in deleted])
+    return deleted
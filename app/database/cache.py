@@ -0,0 +1,212 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.models.User import VersionedUser
+from app.settings import CacheSettings, cache_settings
+
+
+class UserCache(ABC):
+    """Read-through cache of ``VersionedUser`` objects keyed by user id.
+
+    Subclasses implement ``_get``/``_set``/``_delete``; this class adds the
+    counters and the stampede guard that lets one caller per id reach the
+    database while concurrent callers for the same id wait for its result.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[int, Future] = {}
+        self._aloading: Dict[int, asyncio.Future] = {}
+        self._epoch = 0
+
+    @abstractmethod
+    def _get(self, key: int) -> Optional[VersionedUser]:
+        ...
+
+    @abstractmethod
+    def _set(self, key: int, value: VersionedUser) -> None:
+        ...
+
+    @abstractmethod
+    def _delete(self, key: int) -> None:
+        ...
+
+    def get(self, key: int) -> Optional[VersionedUser]:
+        value = self._get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: int, value: VersionedUser) -> None:
+        with self._lock:
+            self._epoch += 1
+        self._set(key, value)
+
+    def delete(self, key: int) -> None:
+        with self._lock:
+            self._epoch += 1
+        self._delete(key)
+
+    def _store(self, key: int, value: Optional[VersionedUser], epoch: int) -> None:
+        # A write that happened while we were loading may have made the value stale.
+        if value is not None and epoch == self._epoch:
+            self._set(key, value)
+
+    def get_or_load(self, key: int, loader: Callable[[], Optional[VersionedUser]]) -> Optional[VersionedUser]:
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            future = self._loading.get(key)
+            loading = future is None
+            if loading:
+                future = self._loading[key] = Future()
+        if not loading:
+            # Waiters share the loader's result, a missing user (None) included.
+            return future.result()
+        try:
+            epoch = self._epoch
+            value = loader()
+            self._store(key, value, epoch)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            with self._lock:
+                del self._loading[key]
+
+    async def aget_or_load(self, key: int,
+                           loader: Callable[[], Awaitable[Optional[VersionedUser]]]) -> Optional[VersionedUser]:
+        value = self.get(key)
+        if value is not None:
+            return value
+        if key in self._aloading:
+            return await asyncio.shield(self._aloading[key])
+        future = self._aloading[key] = asyncio.get_running_loop().create_future()
+        try:
+            epoch = self._epoch
+            value = await loader()
+            self._store(key, value, epoch)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._aloading.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+class NullCache(UserCache):
+    def _get(self, key: int) -> Optional[VersionedUser]:
+        return None
+
+    def _set(self, key: int, value: VersionedUser) -> None:
+        pass
+
+    def _delete(self, key: int) -> None:
+        pass
+
+    def get_or_load(self, key, loader):
+        return loader()
+
+    async def aget_or_load(self, key, loader):
+        return await loader()
+
+
+class LRUCache(UserCache):
+    def __init__(self, max_size: int = 10000, ttl: float = 60):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[int, tuple]" = OrderedDict()
+
+    def _get(self, key: int) -> Optional[VersionedUser]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                self.evictions += 1
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def _set(self, key: int, value: VersionedUser) -> None:
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def _delete(self, key: int) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "size": len(self._items), "max_size": self.max_size, "ttl": self.ttl}
+
+
+class ExternalCache(UserCache):
+    """Cache stored in an external key-value service.
+
+    ``client`` needs redis-style ``get(key)``, ``set(key, value, ex=ttl)``
+    and ``delete(key)`` methods; values are stored as JSON.
+    """
+
+    def __init__(self, client, ttl: int = 60, prefix: str = "user:v2:"):
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _get(self, key: int) -> Optional[VersionedUser]:
+        value = self.client.get(f"{self.prefix}{key}")
+        return VersionedUser.model_validate_json(value) if value is not None else None
+
+    def _set(self, key: int, value: VersionedUser) -> None:
+        self.client.set(f"{self.prefix}{key}", value.model_dump_json(), ex=self.ttl)
+
+    def _delete(self, key: int) -> None:
+        self.client.delete(f"{self.prefix}{key}")
+
+
+def cache_from_env(settings: CacheSettings = cache_settings) -> UserCache:
+    backend = settings.backend.lower()
+    if backend == "memory":
+        return LRUCache(max_size=settings.size, ttl=settings.ttl)
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown USER_CACHE backend: {backend}")
+
+
+user_cache = cache_from_env()
+
+
+def set_user_cache(cache: UserCache) -> None:
+    global user_cache
+    user_cache = cache
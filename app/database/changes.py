@@ -0,0 +1,260 @@
+import asyncio
+import itertools
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.models.User import user_changes_id_seq
+from app.settings import ChangesSettings, changes_settings
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+
+
+class ChangeEvent(NamedTuple):
+    id: int
+    type: str
+    user_id: int
+    user: Optional[Dict[str, Any]]
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict(), ensure_ascii=False, default=str)
+
+
+class Subscription:
+    """One consumer's view of the bus: buffered events to replay, then live ones.
+
+    Live events go through a bounded queue. A consumer that falls
+    ``queue_size`` events behind is marked ``overflowed`` and gets nothing
+    more; it is expected to reconnect with the last id it saw and replay the
+    rest from the ring buffer.
+    """
+
+    def __init__(self, bus: "ChangeBus", head: int, replay: List[ChangeEvent], gap: bool, queue_size: int):
+        self.bus = bus
+        self.head = head
+        self.replay = replay
+        self.gap = gap
+        self.overflowed = False
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def push(self, event: ChangeEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflow()
+
+    def overflow(self) -> None:
+        # Events already queued stay; the consumer drains them before it stops.
+        self.overflowed = True
+
+    async def get(self, timeout: Optional[float]) -> Optional[ChangeEvent]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+
+class ChangeBus:
+    """In-process pub/sub of user changes with a ring buffer for resume.
+
+    ``publish`` may be called from any thread; subscribers live on an event
+    loop and are fed with ``call_soon_threadsafe``. Subclasses that deliver
+    events from elsewhere call ``_dispatch`` with ids they assigned.
+    """
+
+    def __init__(self, buffer_size: int = 1000, queue_size: int = 100):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers: List[Subscription] = []
+
+    @property
+    def last_id(self) -> int:
+        with self._lock:
+            return self._buffer[-1].id if self._buffer else 0
+
+    def publish(self, change_type: str, user_id: int, user: Optional[Dict[str, Any]] = None) -> None:
+        self.publish_many(change_type, [(user_id, user)])
+
+    def publish_many(self, change_type: str, changes: Iterable[Tuple[int, Optional[Dict[str, Any]]]]) -> None:
+        for user_id, user in changes:
+            with self._lock:
+                self._dispatch(ChangeEvent(next(self._ids), change_type, user_id, user))
+
+    async def apublish(self, change_type: str, user_id: int, user: Optional[Dict[str, Any]] = None) -> None:
+        self.publish(change_type, user_id, user)
+
+    async def apublish_many(self, change_type: str,
+                            changes: Iterable[Tuple[int, Optional[Dict[str, Any]]]]) -> None:
+        self.publish_many(change_type, changes)
+
+    def _dispatch(self, event: ChangeEvent) -> None:
+        # Called with the lock held, so buffer order, fan-out order and subscribe() agree.
+        self._buffer.append(event)
+        for subscription in self._subscribers:
+            subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """Subscribe from ``last_event_id``; ``gap`` is set when events after it were already evicted."""
+        with self._lock:
+            replay, gap = [], False
+            newest = self._buffer[-1].id if self._buffer else 0
+            if last_event_id is not None:
+                oldest = self._buffer[0].id if self._buffer else None
+                gap = last_event_id > newest or (oldest is not None and last_event_id < oldest - 1)
+                replay = [event for event in self._buffer if event.id > last_event_id]
+            subscription = Subscription(self, newest, replay, gap, self.queue_size)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": type(self).__name__, "subscribers": len(self._subscribers),
+                    "buffered": len(self._buffer), "last_id": self._buffer[-1].id if self._buffer else 0}
+
+
+class PostgresChangeBus(ChangeBus):
+    """Change bus shared by every worker through PostgreSQL LISTEN/NOTIFY.
+
+    ``publish`` only sends the NOTIFY; a listener thread per process receives
+    it back and dispatches it locally, so every worker buffers the same
+    events. Ids come from a sequence so ``Last-Event-ID`` works across
+    workers; the sequence is created with the tables. Needs a psycopg2 engine.
+
+    Publishing is best-effort: the user write has already committed, so a
+    failed NOTIFY is logged and the event is lost rather than failing the
+    write. Publishing never waits for the listener.
+
+    If the listener's connection fails it reconnects with exponential
+    backoff. Notifications sent meanwhile are lost, so the local buffer is
+    dropped and subscribers are overflowed: they reconnect and, finding
+    their id gone, get a ``reset``.
+    """
+
+    channel = "user_changes"
+    sequence = user_changes_id_seq.name
+
+    def __init__(self, engine, buffer_size: int = 1000, queue_size: int = 100, poll_interval: float = 5,
+                 reconnect_delay: float = 1, max_reconnect_delay: float = 30):
+        super().__init__(buffer_size, queue_size)
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._listener: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def publish_many(self, change_type: str, changes: Iterable[Tuple[int, Optional[Dict[str, Any]]]]) -> None:
+        from sqlalchemy import text
+
+        self._start(wait=False)
+        notify = text(f"SELECT pg_notify(:channel, json_build_object('id', nextval('{self.sequence}'), "
+                      "'type', :type, 'user_id', :user_id, 'user', CAST(:user AS json))::text)")
+        params = [{"channel": self.channel, "type": change_type, "user_id": user_id,
+                   "user": json.dumps(user, default=str) if user is not None else None}
+                  for user_id, user in changes]
+        if not params:
+            return
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(notify, params)
+        except Exception:
+            logger.exception("Could not publish %d user change(s); subscribers will miss them", len(params))
+
+    async def apublish_many(self, change_type: str,
+                            changes: Iterable[Tuple[int, Optional[Dict[str, Any]]]]) -> None:
+        await asyncio.to_thread(self.publish_many, change_type, list(changes))
+
+    async def apublish(self, change_type: str, user_id: int, user: Optional[Dict[str, Any]] = None) -> None:
+        await self.apublish_many(change_type, [(user_id, user)])
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        self._start()
+        return super().subscribe(last_event_id)
+
+    def _start(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="user-changes-listener", daemon=True)
+                self._listener.start()
+        if wait:
+            self._ready.wait(self.poll_interval)
+
+    def _listen(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            connected = time.monotonic()
+            try:
+                self._receive()
+            except Exception:
+                # A connection that stayed up longer than the longest wait starts the backoff over.
+                if time.monotonic() - connected > self.max_reconnect_delay:
+                    delay = self.reconnect_delay
+                logger.exception("User change listener failed; reconnecting in %.1f s", delay)
+            self._drop_buffered()
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _drop_buffered(self) -> None:
+        with self._lock:
+            self._buffer.clear()
+            for subscription in self._subscribers:
+                subscription.loop.call_soon_threadsafe(subscription.overflow)
+
+    def _receive(self) -> None:
+        connection = self.engine.raw_connection()
+        try:
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            self._ready.set()
+            while True:
+                if select.select([dbapi_connection], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    payload = json.loads(dbapi_connection.notifies.pop(0).payload)
+                    with self._lock:
+                        self._dispatch(ChangeEvent(**payload))
+        finally:
+            connection.close()
+
+
+def bus_from_env(settings: ChangesSettings = changes_settings) -> ChangeBus:
+    backend = settings.backend.lower()
+    if backend == "memory":
+        return ChangeBus(settings.buffer_size, settings.queue_size)
+    if backend == "postgres":
+        from app.database.engine import engine
+        return PostgresChangeBus(engine, settings.buffer_size, settings.queue_size)
+    raise ValueError(f"Unknown CHANGES_BACKEND: {backend}")
+
+
+change_bus = bus_from_env()
+
+
+def set_change_bus(bus: ChangeBus) -> None:
+    global change_bus
+    change_bus = bus
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+Outcome = Union[R, BaseException]
+
+
+class _Entry(Generic[T]):
+    __slots__ = ("item", "result", "error", "done")
+
+    def __init__(self, item: T):
+        self.item = item
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class WriteCoalescer(Generic[T, R]):
+    """Group commit for writes submitted concurrently from worker threads.
+
+    The first caller of a window waits up to ``max_delay`` seconds (less if
+    ``max_batch`` items arrive), then hands everything queued so far to
+    ``flush`` in one call. ``flush`` returns one outcome per item: a result,
+    or an exception that is raised to that item's caller only. Batches are
+    flushed one at a time, so items that arrive during a flush form the next
+    batch instead of a concurrent transaction.
+    """
+
+    def __init__(self, flush: Callable[[List[T]], List[Outcome]], max_batch: int = 100, max_delay: float = 0.002):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.items = 0
+        self._lock = threading.Lock()
+        self._full = threading.Condition(self._lock)
+        self._flushing = threading.Lock()
+        self._pending: List[_Entry[T]] = []
+
+    def submit(self, item: T) -> R:
+        entry = _Entry(item)
+        with self._lock:
+            self._pending.append(entry)
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch:
+                self._full.notify()
+        if leader:
+            with self._lock:
+                self._full.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.max_delay)
+            with self._flushing:
+                with self._lock:
+                    batch, self._pending = self._pending, []
+                for start in range(0, len(batch), self.max_batch):
+                    self._run(batch[start:start + self.max_batch])
+        entry.done.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.result
+
+    def _run(self, batch: List[_Entry[T]]) -> None:
+        try:
+            outcomes = self.flush([entry.item for entry in batch])
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        self.batches += 1
+        self.items += len(batch)
+        for entry, outcome in zip(batch, outcomes):
+            if isinstance(outcome, BaseException):
+                entry.error = outcome
+            else:
+                entry.result = outcome
+            entry.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "items": self.items, "max_batch": self.max_batch,
+                "max_delay": self.max_delay}
+
+
+class AsyncWriteCoalescer(Generic[T, R]):
+    """``WriteCoalescer`` for coroutines on one event loop.
+
+    The batch is flushed by a task of its own, so a caller that is cancelled
+    (e.g. the client went away) does not strand the others waiting on it.
+    """
+
+    def __init__(self, flush: Callable[[List[T]], Awaitable[List[Outcome]]], max_batch: int = 100,
+                 max_delay: float = 0.002):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.items = 0
+        self._pending: List[tuple] = []
+        self._full = asyncio.Event()
+        self._flushing = asyncio.Lock()
+        self._tasks = set()
+
+    async def submit(self, item: T) -> R:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) == 1:
+            task = asyncio.create_task(self._lead())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await asyncio.shield(future)
+
+    async def _lead(self) -> None:
+        try:
+            await asyncio.wait_for(self._full.wait(), self.max_delay)
+        except asyncio.TimeoutError:
+            pass
+        async with self._flushing:
+            batch, self._pending = self._pending, []
+            self._full = asyncio.Event()
+            for start in range(0, len(batch), self.max_batch):
+                await self._run(batch[start:start + self.max_batch])
+
+    async def _run(self, batch: List[tuple]) -> None:
+        try:
+            outcomes = await self.flush([item for item, _ in batch])
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        self.batches += 1
+        self.items += len(batch)
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, BaseException):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"batches": self.batches, "items": self.items, "max_batch": self.max_batch,
+                "max_delay": self.max_delay}
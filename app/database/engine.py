@@ -1,14 +1,140 @@
-from dotenv import load_dotenv
+import itertools
+import logging
 import os
+from contextvars import ContextVar
+from typing import List
+from sqlalchemy import MetaData, func, inspect, select
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn, CreateTable
 from sqlmodel import create_engine, SQLModel, text
 
-load_dotenv()
+from app.metrics import TimedQueuePool, instrument_engine
+from app.profiling import profile_engine
+from app.settings import DatabaseSettings, database_settings
 
-engine = create_engine(os.getenv("DATABASE_ENGINE"), pool_size=os.getenv("DATABASE_POOL_SIZE", 10))
+logger = logging.getLogger(__name__)
+
+_primary_only: ContextVar[bool] = ContextVar("primary_only", default=False)
+
+def engine_options(url: str, settings: DatabaseSettings = database_settings) -> dict:
+    url = make_url(url)
+    connect_args = {}
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() == "asyncpg":
+        connect_args["timeout"] = settings.connect_timeout
+        if settings.statement_timeout_ms:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.statement_timeout_ms)}
+    elif url.get_backend_name() == "postgresql":
+        connect_args["connect_timeout"] = settings.connect_timeout
+        if settings.statement_timeout_ms:
+            connect_args["options"] = f"-c statement_timeout={settings.statement_timeout_ms}"
+    elif url.get_backend_name() == "sqlite":
+        connect_args["timeout"] = settings.connect_timeout
+    return {
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+def make_engine(url: str, name: str = "primary") -> Engine:
+    new_engine = create_engine(url, poolclass=TimedQueuePool, **engine_options(url))
+    instrument_engine(new_engine, name)
+    profile_engine(new_engine)
+    return new_engine
+
+engine = make_engine(database_settings.engine)
+replica_engines: List[Engine] = [make_engine(url, f"replica{i}") for i, url in enumerate(database_settings.replicas, 1)]
+_replicas = itertools.cycle(replica_engines)
+
+def dispose_engines(close: bool = True) -> None:
+    for pooled in (engine, *replica_engines):
+        pooled.dispose(close=close)
+
+# A forked worker must not reuse the parent's pooled connections; close=False
+# drops them without closing sockets the parent may still be using.
+os.register_at_fork(after_in_child=lambda: dispose_engines(close=False))
+
+def mark_write() -> None:
+    _primary_only.set(True)
+
+def primary_only() -> bool:
+    return _primary_only.get()
+
+async def reset_read_your_writes() -> None:
+    _primary_only.set(False)
+
+def read_engine(primary: Engine) -> Engine:
+    if replica_engines and not _primary_only.get():
+        return next(_replicas)
+    return primary
+
+def _index_names(conn, table_name: str) -> set:
+    if conn.dialect.name == "sqlite":
+        # SQLite reflection skips expression indexes, so ask the catalog directly.
+        query = text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table")
+        return set(conn.execute(query, {"table": table_name}).scalars())
+    return {index["name"] for index in inspect(conn).get_indexes(table_name)}
+
+def _check_unique(conn, index) -> None:
+    # Tables from before a unique index may hold duplicates; say which instead of a raw IntegrityError.
+    columns = list(index.columns)
+    query = select(*columns, func.count()).group_by(*columns).having(func.count() > 1).limit(5)
+    duplicates = conn.execute(query).all()
+    if duplicates:
+        values = ", ".join(repr(row[:-1] if len(columns) > 1 else row[0]) for row in duplicates)
+        names = ", ".join(column.name for column in columns)
+        raise RuntimeError(f"Cannot create unique index {index.name}: {index.table.name} has duplicate "
+                           f"{names} values (e.g. {values}); remove or change the duplicates and restart")
+
+def create_indexes(conn) -> None:
+    # create_all only creates indexes together with new tables; this adds
+    # indexes introduced later to tables that already exist.
+    for table in SQLModel.metadata.sorted_tables:
+        existing = _index_names(conn, table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                if index.unique:
+                    _check_unique(conn, index)
+                index.create(conn)
+
+def create_columns(conn) -> None:
+    # Likewise for columns: ones added later get ALTER TABLE, so they need a server default.
+    for table in SQLModel.metadata.sorted_tables:
+        existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                table_name = conn.dialect.identifier_preparer.format_table(table)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {CreateColumn(column).compile(conn)}"))
+
+def add_autoincrement(conn) -> None:
+    # sqlite_autoincrement only takes effect in CREATE TABLE, and without it SQLite reuses a
+    # deleted largest id, so tables created before it are rebuilt. create_indexes runs after.
+    if conn.dialect.name != "sqlite":
+        return
+    query = text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table")
+    for table in SQLModel.metadata.sorted_tables:
+        sql = conn.execute(query, {"table": table.name}).scalar()
+        if not table.dialect_options["sqlite"]["autoincrement"] or sql is None or "AUTOINCREMENT" in sql.upper():
+            continue
+        rebuilt = table.to_metadata(MetaData(), name=f"{table.name}_rebuilt")
+        preparer = conn.dialect.identifier_preparer
+        old_name, new_name = preparer.format_table(table), preparer.format_table(rebuilt)
+        columns = ", ".join(preparer.quote(column.name) for column in table.columns)
+        conn.execute(CreateTable(rebuilt))
+        # Explicit ids raise sqlite_sequence to the largest one copied.
+        conn.execute(text(f"INSERT INTO {new_name} ({columns}) SELECT {columns} FROM {old_name}"))
+        conn.execute(text(f"DROP TABLE {old_name}"))
+        conn.execute(text(f"ALTER TABLE {new_name} RENAME TO {old_name}"))
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        create_columns(conn)
+        add_autoincrement(conn)
+        create_indexes(conn)
 
 def check_availability() -> bool:
     try:
@@ -16,5 +142,5 @@ def check_availability() -> bool:
             session.execute(text("SELECT 1"))
         return True
     except Exception as e:
-        print(f"Database connection failed: {e}")
-        return False
\ No newline at end of file
+        logger.warning("Database connection failed: %s", e)
+        return False
@@ -1,48 +1,340 @@
-from typing import Iterable, Optional
+import csv
+import io
+import string
+import sys
+from math import ceil
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from fastapi_pagination import Params
+from sqlalchemy import Row, Select, and_, delete, func, insert, select as sa_select, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
-from app.database.engine import engine
-from app.models.User import User, UserCreate, UserUpdate, UserResponse
+from app.database import cache, changes
+from app.database.coalescer import WriteCoalescer
+from app.database.engine import engine, mark_write, read_engine
+from app.models.User import USER_FIELDS, User, UserCreate, UserFilter, UserUpdate, UserResponse, VersionedUser
+from app.settings import database_settings
 
-def get_user(user_id: int) -> Optional[User]:
+BULK_CHUNK_SIZE = database_settings.bulk_chunk_size
+EXPORT_BATCH_SIZE = database_settings.export_batch_size
+USER_COLUMNS = ("email", "first_name", "last_name", "avatar")
+# SQLite's lower() only folds ASCII letters; the prefix must be folded the same way to compare equal.
+SQLITE_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+class EmailConflict(IntegrityError):
+    """A create rejected before reaching the database because its email is already taken."""
+
+    def __init__(self, email: str):
+        super().__init__("INSERT INTO user", {"email": email}, ValueError(f"email already exists: {email}"))
+
+def is_email_conflict(error: IntegrityError) -> bool:
+    """Whether ``error`` is the unique email index rejecting a duplicate rather than another constraint."""
+    if isinstance(error, EmailConflict):
+        return True
+    # PostgreSQL reports the index name, SQLite the table and column.
+    message = str(error.orig)
+    return "ix_user_email" in message or f"{User.__tablename__}.email" in message
+
+class VersionMismatch(Exception):
+    """A conditional write found the user missing or at a version the caller did not expect."""
+
+    def __init__(self, user_id: int):
+        super().__init__(f"user {user_id} is not at the expected version")
+        self.user_id = user_id
+
+SORT_COLUMNS = {"id": User.id, "email": User.email,
+                "last_name": func.lower(User.last_name), "first_name": func.lower(User.first_name)}
+
+# Appended to a projection when the caller needs an ETag; never part of the body.
+VERSION_COLUMNS = (User.id.label("etag_id"), User.version.label("etag_version"))
+
+def select_columns(fields: Optional[Sequence[str]] = None, versions: bool = False) -> Select:
+    # SQLAlchemy's select keeps one-column projections as rows; sqlmodel's would yield scalars.
+    columns = User.__table__.c
+    return sa_select(*(columns[name] for name in (USER_FIELDS if fields is None else fields)),
+                     *(VERSION_COLUMNS if versions else ()))
+
+def row_dicts(rows: Sequence[Row], versions: bool = False) -> List[Dict[str, Any]]:
+    if not versions:
+        return [dict(row._mapping) for row in rows]
+    keys = rows[0]._fields[:-len(VERSION_COLUMNS)] if rows else ()
+    return [dict(zip(keys, row)) for row in rows]
+
+def row_versions(rows: Iterable[Row]) -> List[Tuple[int, int]]:
+    return [tuple(row[-len(VERSION_COLUMNS):]) for row in rows]
+
+def _prefix_match(column, prefix: str, dialect):
+    lowered = func.lower(column)
+    if dialect.name == "sqlite":
+        prefix = prefix.translate(SQLITE_LOWER)
+        # SQLite only optimises LIKE on plain columns; a range can use the lower() index.
+        # The upper bound carries past U+10FFFF, which has no successor; all-U+10FFFF prefixes have none.
+        upper = prefix.rstrip(chr(sys.maxunicode))
+        if not upper:
+            return lowered >= prefix
+        return and_(lowered >= prefix, lowered < upper[:-1] + chr(ord(upper[-1]) + 1))
+    return lowered.startswith(prefix.lower(), autoescape=True)
+
+def filter_users(query, user_filter: Optional[UserFilter], dialect):
+    if user_filter is None:
+        return query
+    if user_filter.email is not None:
+        query = query.where(User.email == user_filter.email)
+    if user_filter.last_name:
+        query = query.where(_prefix_match(User.last_name, user_filter.last_name, dialect))
+    if user_filter.first_name:
+        query = query.where(_prefix_match(User.first_name, user_filter.first_name, dialect))
+    return query
+
+def sort_users(query, user_filter: Optional[UserFilter]):
+    keys = user_filter.sort if user_filter else ["id"]
+    order = [SORT_COLUMNS[key.lstrip("-")].desc() if key.startswith("-") else SORT_COLUMNS[key] for key in keys]
+    if not any(key.lstrip("-") in ("id", "email") for key in keys):
+        order.append(User.id)  # names are not unique; keep pages stable
+    return query.order_by(*order)
+
+def _load_user(user_id: int) -> Optional[VersionedUser]:
+    with Session(read_engine(engine)) as session:
+        user = session.get(User, user_id)
+        return VersionedUser.model_validate(user) if user else None
+
+def get_user(user_id: int) -> Optional[VersionedUser]:
+    return cache.user_cache.get_or_load(user_id, lambda: _load_user(user_id))
+
+def get_user_fields(user_id: int, fields: Sequence[str]) -> Optional[Tuple[Dict[str, Any], int]]:
+    """The requested fields of a user and the user's version."""
+    # The cache holds whole users; a projection is cheaper to read straight from the table.
+    with Session(read_engine(engine)) as session:
+        row = session.exec(select_columns(fields, versions=True).where(User.id == user_id)).first()
+        return (row_dicts([row], versions=True)[0], row.etag_version) if row else None
+
+def page_result(rows: Sequence[Row], total: int, params: Params, versions: bool = False) -> Dict[str, Any]:
+    return {"items": row_dicts(rows, versions), "total": total, "page": params.page,
+            "size": params.size, "pages": ceil(total / params.size)}
+
+def get_users_page_rows(params: Params, user_filter: Optional[UserFilter] = None,
+                        fields: Optional[Sequence[str]] = None, versions: bool = False) -> Tuple[List[Row], int]:
+    with Session(read_engine(engine)) as session:
+        query = filter_users(select_columns(fields, versions), user_filter, session.bind.dialect)
+        total = session.exec(select(func.count()).select_from(query.subquery())).one()
+        query = sort_users(query, user_filter).offset((params.page - 1) * params.size).limit(params.size)
+        return session.exec(query).all(), total
+
+def get_users_page(params: Params, user_filter: Optional[UserFilter] = None,
+                   fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    rows, total = get_users_page_rows(params, user_filter, fields)
+    return page_result(rows, total, params)
+
+def get_users_after(cursor: Optional[int], limit: int, user_filter: Optional[UserFilter] = None,
+                    fields: Optional[Sequence[str]] = None, versions: bool = False) -> Iterable[Row]:
+    query = select_columns(fields, versions).order_by(User.id).limit(limit)
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+    with Session(read_engine(engine)) as session:
+        return session.exec(filter_users(query, user_filter, session.bind.dialect)).all()
+
+def iter_user_batches(batch_size: int = EXPORT_BATCH_SIZE,
+                      fields: Optional[Sequence[str]] = None) -> Iterator[List[Dict]]:
+    query = select_columns(fields).order_by(User.id)
+    with read_engine(engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for batch in result.mappings().partitions():
+            yield [dict(row) for row in batch]
+
+def get_users_by_ids(user_ids: List[int], chunk_size: int = BULK_CHUNK_SIZE) -> List[Row]:
+    unique_ids = list(dict.fromkeys(user_ids))
+    users = []
+    with Session(read_engine(engine)) as session:
+        for start in range(0, len(unique_ids), chunk_size):
+            query = select_columns().where(User.id.in_(unique_ids[start:start + chunk_size]))
+            users.extend(session.exec(query).all())
+    return users
+
+def _insert_user(session: Session, values: Dict[str, Any]) -> Dict[str, Any]:
+    if session.bind.dialect.insert_returning:
+        return dict(session.exec(insert(User).values(**values).returning(*User.__table__.c)).mappings().one())
+    result = session.exec(insert(User).values(**values))
+    return {**values, "id": result.inserted_primary_key[0], "version": 1}
+
+def _create_user(user_create: UserCreate) -> VersionedUser:
     with Session(engine) as session:
-        return session.get(User, user_id)
+        row = _insert_user(session, user_create.model_dump())
+        session.commit()
+    response = VersionedUser.model_validate(row)
+    changes.change_bus.publish(changes.CREATED, response.id, response.model_dump())
+    return response
+
+def claim_emails(rows: List[Dict[str, Any]], taken: Iterable[str]) -> List[Optional[EmailConflict]]:
+    # Conflicts are decided up front, so one duplicate does not roll back the rest of the group.
+    seen = set(taken)
+    conflicts = []
+    for row in rows:
+        conflicts.append(EmailConflict(row["email"]) if row["email"] in seen else None)
+        seen.add(row["email"])
+    return conflicts
+
+def group_result(conflicts: List[Optional[EmailConflict]], rows: Iterable[Dict[str, Any]]
+                 ) -> List[Union[VersionedUser, Exception]]:
+    inserted = iter(rows)
+    return [conflict or VersionedUser.model_validate(next(inserted)) for conflict in conflicts]
 
-def get_users() -> Iterable[User]:
+def created_changes(outcomes: Iterable[Union[UserResponse, Exception]]) -> List[Tuple[int, Dict[str, Any]]]:
+    return [(outcome.id, outcome.model_dump()) for outcome in outcomes if isinstance(outcome, UserResponse)]
+
+def create_user_group(users_create: List[UserCreate]) -> List[Union[VersionedUser, Exception]]:
+    """Insert concurrent creates in one transaction; each gets its own user or error back."""
+    if len(users_create) == 1:
+        try:
+            return [_create_user(users_create[0])]
+        except Exception as e:
+            return [e]
+    rows = [user_create.model_dump() for user_create in users_create]
+    try:
+        with Session(engine) as session:
+            taken = session.exec(select(User.email).where(User.email.in_({row["email"] for row in rows}))).all()
+            conflicts = claim_emails(rows, taken)
+            fresh = [row for row, conflict in zip(rows, conflicts) if conflict is None]
+            if fresh and session.bind.dialect.insert_executemany_returning_sort_by_parameter_order:
+                query = insert(User).returning(*User.__table__.c, sort_by_parameter_order=True)
+                inserted = [dict(row) for row in session.exec(query, params=fresh).mappings()]
+            else:
+                inserted = [_insert_user(session, row) for row in fresh]
+            session.commit()
+    except IntegrityError:
+        # Another writer took an email after the check: fall back to one commit per user.
+        outcomes = []
+        for user_create in users_create:
+            try:
+                outcomes.append(_create_user(user_create))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    outcomes = group_result(conflicts, inserted)
+    changes.change_bus.publish_many(changes.CREATED, created_changes(outcomes))
+    return outcomes
+
+create_coalescer: Optional[WriteCoalescer] = None
+if database_settings.coalesce_window_ms:
+    create_coalescer = WriteCoalescer(create_user_group, database_settings.coalesce_max_batch,
+                                      database_settings.coalesce_window_ms / 1000)
+
+def create_user(user_create: UserCreate) -> VersionedUser:
+    mark_write()
+    if create_coalescer is not None:
+        return create_coalescer.submit(user_create)
+    return _create_user(user_create)
+
+def check_version(user_id: int, user: Optional[VersionedUser],
+                  versions: Optional[Collection[int]]) -> Optional[VersionedUser]:
+    if versions is not None and (user is None or user.version not in versions):
+        raise VersionMismatch(user_id)
+    return user
+
+def versioned_query(query, user_id: int, versions: Optional[Collection[int]]):
+    query = query.where(User.id == user_id)
+    return query if versions is None else query.where(User.version.in_(versions))
+
+def update_values(user_update: UserUpdate) -> Dict[str, Any]:
+    # A null clears a nullable column such as avatar; for a required one it leaves the
+    # field alone, as the update did before RETURNING, instead of failing NOT NULL.
+    columns = User.__table__.c
+    return {name: value for name, value in user_update.model_dump(exclude_unset=True).items()
+            if value is not None or columns[name].nullable}
+
+def update_user(user_id: int, user_update: UserUpdate,
+                versions: Optional[Collection[int]] = None) -> Optional[VersionedUser]:
+    """Update a user; with ``versions`` only if it is at one of them, else ``VersionMismatch``."""
+    values = update_values(user_update)
+    if not values:
+        return check_version(user_id, get_user(user_id), versions)
+    mark_write()
     with Session(engine) as session:
-        return session.exec(select(User)).all()
+        query = versioned_query(update(User), user_id, versions).values(**values, version=User.version + 1)
+        if session.bind.dialect.update_returning:
+            row = session.exec(query.returning(*User.__table__.c)).mappings().one_or_none()
+            row = dict(row) if row else None
+        else:
+            result = session.exec(query)
+            row = session.get(User, user_id) if result.rowcount else None
+        response = VersionedUser.model_validate(row) if row else None
+        session.commit()
+    # Invalidate rather than store: a slower concurrent write could otherwise cache an older version.
+    cache.user_cache.delete(user_id)
+    if response:
+        changes.change_bus.publish(changes.UPDATED, user_id, response.model_dump())
+    if response is None and versions is not None:
+        raise VersionMismatch(user_id)
+    return response
 
-def create_user(user_create: UserCreate) -> UserResponse:
+def delete_user(user_id: int, versions: Optional[Collection[int]] = None) -> bool:
+    """Delete a user; with ``versions`` only if it is at one of them, else ``VersionMismatch``."""
+    mark_write()
     with Session(engine) as session:
-        db_user = User(email=user_create.email, first_name=user_create.first_name,
-                      last_name=user_create.last_name, avatar=user_create.avatar)
-        session.add(db_user)
+        query = versioned_query(delete(User), user_id, versions)
+        if session.bind.dialect.delete_returning:
+            deleted = session.exec(query.returning(User.id)).scalar_one_or_none() is not None
+        else:
+            deleted = session.exec(query).rowcount > 0
         session.commit()
-        session.refresh(db_user)
-        return UserResponse.model_validate(db_user)
+    cache.user_cache.delete(user_id)
+    if deleted:
+        changes.change_bus.publish(changes.DELETED, user_id)
+    elif versions is not None:
+        raise VersionMismatch(user_id)
+    return deleted
+
+def _copy_users(session: Session, rows: List[dict]) -> List[int]:
+    ids = session.exec(text(
+        f"SELECT nextval(pg_get_serial_sequence('\"{User.__tablename__}\"', 'id')) FROM generate_series(1, :n)"
+    ), params={"n": len(rows)}).scalars().all()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for user_id, row in zip(ids, rows):
+        writer.writerow([user_id, *(row[column] for column in USER_COLUMNS)])
+    buffer.seek(0)
+    cursor = session.connection().connection.dbapi_connection.cursor()
+    statement = f"COPY \"{User.__tablename__}\" (id, {', '.join(USER_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    try:
+        cursor.copy_expert(statement, buffer)
+    except session.bind.dialect.dbapi.IntegrityError as e:
+        # The raw cursor bypasses SQLAlchemy's wrapping; callers expect its IntegrityError like the other paths.
+        raise IntegrityError(statement, None, e) from e
+    return ids
 
-def update_user(user_id: int, user_update: UserUpdate) -> Optional[UserResponse]:
+def create_users(users_create: List[UserCreate], chunk_size: int = BULK_CHUNK_SIZE) -> List[int]:
+    rows = [user_create.model_dump() for user_create in users_create]
+    ids = []
+    mark_write()
     with Session(engine) as session:
-        db_user = session.get(User, user_id)
-        if not db_user:
-            return None
-        if user_update.email:
-            db_user.email = user_update.email
-        if user_update.first_name:
-            db_user.first_name = user_update.first_name
-        if user_update.last_name:
-            db_user.last_name = user_update.last_name
-        if user_update.avatar:
-            db_user.avatar = user_update.avatar
+        dialect = session.bind.dialect
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+                ids.extend(_copy_users(session, chunk))
+            elif dialect.insert_executemany_returning_sort_by_parameter_order:
+                query = insert(User).returning(User.id, sort_by_parameter_order=True)
+                ids.extend(session.exec(query, params=chunk).scalars().all())
+            else:
+                ids.extend(session.exec(insert(User).values(**row)).inserted_primary_key[0] for row in chunk)
         session.commit()
-        session.refresh(db_user)
-        return UserResponse.model_validate(db_user)
+    changes.change_bus.publish_many(changes.CREATED, [(user_id, {"id": user_id, **row, "version": 1})
+                                                      for user_id, row in zip(ids, rows)])
+    return ids
 
-def delete_user(user_id: int) -> bool:
+def delete_users(user_ids: List[int], chunk_size: int = BULK_CHUNK_SIZE) -> List[int]:
+    deleted = []
+    mark_write()
     with Session(engine) as session:
-        db_user = session.get(User, user_id)
-        if not db_user:
-            return False
-        session.delete(db_user)
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            query = delete(User).where(User.id.in_(chunk))
+            if session.bind.dialect.delete_returning:
+                deleted.extend(session.exec(query.returning(User.id)).scalars().all())
+            else:
+                deleted.extend(session.exec(select(User.id).where(User.id.in_(chunk))).all())
+                session.exec(query)
         session.commit()
-        return True
\ No newline at end of file
+    for user_id in deleted:
+        cache.user_cache.delete(user_id)
+    changes.change_bus.publish_many(changes.DELETED, [(user_id, None) for user_id in deleted])
+    return deleted
@@ -0,0 +1,61 @@
+"""Strong ETags from row versions, and the conditional request checks.
+
+Every write in ``app.database.users`` bumps the user's ``version``, so a
+user's ETag, ``"<id>.<version>"``, changes exactly when the user does; a
+projection (``?fields=``) appends a hash of the field set. A list page's
+ETag hashes the ids and versions on it together with the extras the caller
+passes: the page, size or limit, the total and the field set. Both are
+known before anything is serialized, so a matching ``If-None-Match`` gets a
+bare 304. Rows changed behind the application's back keep their version and
+so their ETag.
+"""
+import hashlib
+from typing import Iterable, Optional, Sequence, Set, Tuple
+
+from fastapi import Header, Request, Response, status
+
+
+def fields_key(fields: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+    return tuple(sorted(fields)) if fields else None
+
+
+def user_etag(user_id: int, version: int, fields: Optional[Sequence[str]] = None) -> str:
+    if not fields:
+        return f'"{user_id}.{version}"'
+    projection = hashlib.blake2b(",".join(fields_key(fields)).encode(), digest_size=4).hexdigest()
+    return f'"{user_id}.{version};{projection}"'
+
+
+def rows_etag(versions: Iterable[Tuple[int, int]], *extra) -> str:
+    digest = hashlib.blake2b(repr(extra).encode(), digest_size=16)
+    for user_id, version in versions:
+        digest.update(b"%d.%d;" % (user_id, version))
+    return f'"{digest.hexdigest()}"'
+
+
+def none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def if_match_versions(user_id: int, if_match: Optional[str] = Header(None)) -> Optional[Set[int]]:
+    """Versions of the user that ``If-Match`` accepts; ``None`` when any will do."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    prefix = f'"{user_id}.'
+    versions = set()
+    for tag in (tag.strip() for tag in if_match.split(",")):
+        # If-Match uses the strong comparison: weak tags and other users' tags never match.
+        # A projection's tag names the same version as the full user's.
+        version = tag[len(prefix):-1].partition(";")[0]
+        if tag.startswith(prefix) and tag.endswith('"') and version.isdigit():
+            versions.add(int(version))
+    return versions
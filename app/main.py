@@ -2,18 +2,42 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 
-from routers import status, users
-from app.database.engine import create_db_and_tables
+from app.profiling import ProfilingMiddleware
+from app.responses import FastJSONResponse
+from app.routers import changes, status
+from app.database.engine import create_db_and_tables, dispose_engines
+from app.settings import database_settings, profiling_settings
+
+if database_settings.use_async:
+    from app.routers import async_users as users
+else:
+    from app.routers import users
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Runs after in-flight requests have drained, so pooled connections close cleanly.
+    if database_settings.use_async:
+        from app.database.async_engine import dispose_async_engines
+        await dispose_async_engines()
+    dispose_engines()
 
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
+if profiling_settings.enabled:
+    app.add_middleware(ProfilingMiddleware)
 app.include_router(status.router)
+# Before the users routes, so /api/users/changes is not taken for a user id.
+app.include_router(changes.router)
 app.include_router(users.router)
 
 
 if __name__ == "__main__":
     create_db_and_tables()
-    uvicorn.run(app, host="localhost", port=8002)
\ No newline at end of file
+    uvicorn.run(app, host="localhost", port=8002)
@@ -0,0 +1,206 @@
+"""Prometheus-style metrics for the users service.
+
+Observations are written to per-thread shards without locking; a scrape
+sums the shards. Routes are instrumented through ``MetricsRoute`` and
+engines through ``instrument_engine``.
+"""
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from app.settings import metrics_settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._local = threading.local()
+        self._shards: List[Dict[Labels, list]] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Labels, list]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> Dict[Labels, list]:
+        merged: Dict[Labels, list] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, values in list(shard.items()):
+                total = merged.setdefault(labels, [0] * len(values))
+                for i, value in enumerate(values):
+                    total[i] += value
+        return merged
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        shard = self._shard()
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0]
+        values[0] += amount
+
+    def samples(self):
+        return [(self.name, labels, values[0]) for labels, values in sorted(self._merged().items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        shard = self._shard()
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 3)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def samples(self):
+        samples = []
+        for labels, values in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), values):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels + (("le", str(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", labels, values[-2]))
+            samples.append((f"{self.name}_count", labels, values[-1]))
+        return samples
+
+
+http_requests = Counter("http_requests_total", "HTTP requests by route, method and status.")
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route and method.")
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served by route.")
+http_requests_shed = Counter("http_requests_shed_total", "Requests answered 503 by admission control by route and reason.")
+db_query_latency = Histogram("db_query_duration_seconds", "SQL statement execution time by engine.")
+db_pool_wait = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection by engine.")
+
+_engines: Dict[str, object] = {}
+
+
+class MetricsRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not metrics_settings.enabled:
+            return handler
+        path = self.path
+
+        async def instrumented(request: Request) -> Response:
+            method = request.method
+            http_in_flight.inc(route=path, method=method)
+            started = time.perf_counter()
+            status_code = 500
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except Exception as e:
+                status_code = getattr(e, "status_code", 500)
+                raise
+            finally:
+                http_latency.observe(time.perf_counter() - started, route=path, method=method)
+                http_requests.inc(route=path, method=method, status=str(status_code))
+                http_in_flight.dec(route=path, method=method)
+
+        return instrumented
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    engine_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - started, engine=self.engine_name)
+
+
+def instrument_engine(engine, name: str = "primary") -> None:
+    _engines[name] = engine
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.engine_name = name
+    if not metrics_settings.enabled:
+        return
+
+    # The start time lives on the per-statement context, so a statement that
+    # fails (and never reaches after_cursor_execute) leaves nothing behind.
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            db_query_latency.observe(time.perf_counter() - started, engine=name)
+
+
+def _pool_samples() -> List[str]:
+    lines = []
+    gauges = (
+        ("db_pool_size", "Configured pool size.", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections currently checked out.", lambda pool: pool.checkedout()),
+        ("db_pool_overflow", "Connections opened beyond pool_size.", lambda pool: max(pool.overflow(), 0)),
+    )
+    for name, documentation, read in gauges:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+        for engine_name, engine in sorted(_engines.items()):
+            if isinstance(engine.pool, QueuePool):
+                lines.append(f'{name}{{engine="{engine_name}"}} {read(engine.pool)}')
+    return lines
+
+
+def render() -> str:
+    metrics = (http_requests, http_latency, http_in_flight, http_requests_shed, db_query_latency, db_pool_wait)
+    return "\n".join([*(metric.render() for metric in metrics), *_pool_samples()]) + "\n"
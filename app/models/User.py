@@ -1,15 +1,35 @@
-from typing import Optional
-from pydantic import EmailStr
+from typing import Any, Dict, List, Optional
+from pydantic import ConfigDict, EmailStr
+from sqlalchemy import Index, Sequence, func, text
 from sqlmodel import Field, SQLModel
 
 class UserBase(SQLModel):
-    email: EmailStr
+    email: EmailStr = Field(unique=True, index=True)
     first_name: str
     last_name: str
     avatar: Optional[str] = None
 
 class User(UserBase, table=True):
+    # Versions identify a row's content only while ids are never reused, which
+    # SQLite guarantees for the largest id just with AUTOINCREMENT.
+    __table_args__ = {"sqlite_autoincrement": True}
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": text("1")})
+
+# Name search and sort are case-insensitive, so the composite index is on lower().
+# PostgreSQL can only use an index for LIKE 'prefix%' with the pattern operator
+# class, which in turn cannot serve ORDER BY, hence the second index there.
+Index("ix_user_name", func.lower(User.last_name), func.lower(User.first_name))
+Index("ix_user_name_pattern", func.lower(User.last_name).label("last_name"), func.lower(User.first_name).label("first_name"),
+      postgresql_ops={"last_name": "text_pattern_ops", "first_name": "text_pattern_ops"}).ddl_if(dialect="postgresql")
+
+# Change feed event ids (see app.database.changes), shared by every worker. Created with the
+# tables; dialects without sequences skip it.
+user_changes_id_seq = Sequence("user_changes_id_seq", metadata=SQLModel.metadata)
+
+USER_SORT_KEYS = ("id", "email", "last_name", "first_name")
+USER_FIELDS = ("id", "email", "first_name", "last_name", "avatar")
 
 class UserCreate(UserBase):
     pass
@@ -20,8 +40,41 @@ class UserUpdate(SQLModel):
     last_name: Optional[str] = None
     avatar: Optional[str] = None
 
+class UserFilter(SQLModel):
+    email: Optional[str] = None
+    last_name: Optional[str] = None
+    first_name: Optional[str] = None
+    sort: List[str] = ["id"]
+
 class UserResponse(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
 
-    class Config:
-        orm_mode = True
\ No newline at end of file
+class VersionedUser(UserResponse):
+    """A user as the CRUD layer returns it; ``version`` goes out in the ETag, not the body."""
+
+    version: int
+
+    def response(self) -> Dict[str, Any]:
+        return self.model_dump(exclude={"version"})
+
+class UserCursorPage(SQLModel):
+    data: List[UserResponse]
+    next_cursor: Optional[int] = None
+
+class UserBulkError(SQLModel):
+    index: int
+    detail: List[Dict[str, Any]]
+
+class UserBulkResult(SQLModel):
+    ids: List[Optional[int]]
+    errors: List[UserBulkError] = []
+
+class UserBulkDeleteResult(SQLModel):
+    deleted: List[int]
+    missing: List[int] = []
+
+class UserBatchResult(SQLModel):
+    data: List[UserResponse]
+    missing: List[int] = []
@@ -0,0 +1,172 @@
+"""Per-request SQL profiling, enabled with ``PROFILING_ENABLED=true``.
+
+``ProfilingMiddleware`` gives each request a ``RequestProfile`` that the
+cursor hooks installed by ``profile_engine`` fill in. The response gets a
+``Server-Timing`` header with the query count, DB time and the rest of the
+app time; slow requests are logged with their statements, and a statement
+shape repeated more than ``PROFILING_REPEATED_STATEMENTS`` times in one
+request is reported as a likely N+1. ``PROFILING_CPROFILE_ROUTE`` (a regex
+on ``"METHOD /path"``) dumps cProfile stats for a sample of matching
+requests; the event loop's profile also holds whatever else the loop ran
+meanwhile. Only one request is sampled at a time: matching requests that
+arrive while a sample runs are not profiled. When disabled nothing is
+installed, so there is no overhead.
+
+``Server-Timing`` is sent with the response headers, so queries run while a
+streaming body is sent are only in the log, not in the header.
+"""
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.settings import ProfilingSettings, profiling_settings
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_placeholders = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_value_lists = re.compile(rf"\(\s*{_placeholders}(?:\s*,\s*{_placeholders})*\s*\)")
+_whitespace = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    # Expanded IN lists differ only in their length; they are one shape.
+    return _value_lists.sub("(?)", _whitespace.sub(" ", statement).strip())
+
+
+class RequestProfile:
+    __slots__ = ("statements", "db_time", "profilers")
+
+    def __init__(self):
+        self.statements: List[Tuple[str, float]] = []
+        self.db_time = 0.0
+        self.profilers: Optional[List[cProfile.Profile]] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.statements.append((statement, duration))
+        self.db_time += duration
+
+    def server_timing(self, total: float) -> str:
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{len(self.statements)} queries", '
+                f"app;dur={max(total - self.db_time, 0) * 1000:.2f}")
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        shapes = Counter(statement_shape(statement) for statement, _ in self.statements)
+        return [(shape, count) for shape, count in shapes.most_common() if count > threshold]
+
+
+def profile_engine(engine) -> None:
+    if not profiling_settings.enabled:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None and context is not None:
+            context._profile_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        started = getattr(context, "_profile_started", None)
+        if profile is not None and started is not None:
+            profile.record(statement, time.perf_counter() - started)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, settings: ProfilingSettings = profiling_settings):
+        self.app = app
+        self.settings = settings
+        self.cprofile_route = re.compile(settings.cprofile_route) if settings.cprofile_route else None
+        # Concurrent requests share the event loop thread, where a second enabled profiler would
+        # displace the first, so a request that matches while a sample runs is simply not sampled.
+        self._sampling = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_line = f"{scope['method']} {scope['path']}"
+        profile = RequestProfile()
+        profiler = None
+        if (self.cprofile_route is not None and self.cprofile_route.fullmatch(request_line)
+                and random.random() < self.settings.cprofile_sample_rate and self._sampling.acquire(blocking=False)):
+            profiler = cProfile.Profile()
+            profile.profilers = [profiler]
+        token = _current.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._sampling.release()
+            _current.reset(token)
+            self.report(request_line, profile, time.perf_counter() - started)
+
+    def report(self, request_line: str, profile: RequestProfile, total: float) -> None:
+        if total * 1000 >= self.settings.slow_ms:
+            statements = "\n".join(f"  {duration * 1000:8.2f} ms  {_whitespace.sub(' ', statement)}"
+                                   for statement, duration in profile.statements)
+            logger.warning("Slow request %s: %.1f ms, %d queries, %.1f ms in DB\n%s", request_line, total * 1000,
+                           len(profile.statements), profile.db_time * 1000, statements)
+        for shape, count in profile.repeated(self.settings.repeated_statements):
+            logger.warning("Possible N+1 in %s: statement ran %d times: %s", request_line, count, shape)
+        if profile.profilers:
+            self.dump(request_line, profile.profilers)
+
+    def dump(self, request_line: str, profilers: List[cProfile.Profile]) -> None:
+        os.makedirs(self.settings.cprofile_dir, exist_ok=True)
+        name = re.sub(r"[^\w]+", "_", request_line).strip("_")
+        path = os.path.join(self.settings.cprofile_dir, f"{name}_{time.time_ns()}.prof")
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(path)
+        logger.info("Wrote cProfile stats for %s to %s", request_line, path)
+
+
+def _profile_in_thread(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    def profiled(*args, **kwargs):
+        profile = _current.get()
+        if profile is None or profile.profilers is None:
+            return endpoint(*args, **kwargs)
+        # cProfile only sees the thread it is enabled in; sync endpoints run in the threadpool.
+        profiler = cProfile.Profile()
+        profile.profilers.append(profiler)
+        return profiler.runcall(endpoint, *args, **kwargs)
+
+    return profiled
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose sync endpoint is included in sampled cProfile dumps."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        sampled = profiling_settings.enabled and profiling_settings.cprofile_route
+        if sampled and not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profile_in_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
@@ -0,0 +1,28 @@
+"""JSON responses rendered once, with orjson when it is installed.
+
+Routes that already hold plain data (``Row`` mappings from the database or a
+cached ``UserResponse`` dumped to a dict) return ``FastJSONResponse``
+directly. FastAPI passes Response objects through untouched, so the data is
+neither validated against ``response_model`` again nor run through
+``jsonable_encoder``.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
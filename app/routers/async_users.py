@@ -0,0 +1,118 @@
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple, Union
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi_pagination import Page, Params
+from sqlalchemy.exc import IntegrityError
+from app.database import async_users as user_crud
+from app.database.engine import reset_read_your_writes
+from app.etags import if_match_versions
+from app.models.User import (UserCreate, UserUpdate, UserResponse, UserCursorPage, UserBulkResult, UserBulkDeleteResult,
+                             UserBatchResult, UserFilter)
+from app.responses import FastJSONResponse
+from app.routers.users import (EXPORT_FIELDS, VERSION_MISMATCH, UsersRoute, aexport_stream, batch_result, bulk_result,
+                               cursor_response, export_response, integrity_error, page_response, parse_fields,
+                               parse_filter, parse_ids, user_response, validate_users, written_response)
+
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=UsersRoute,
+                   dependencies=[Depends(reset_read_your_writes)])
+
+@router.get("/", response_model=Union[UserCursorPage, Page[UserResponse]])
+async def get_users(
+        request: Request,
+        params: Params = Depends(),
+        cursor: Optional[int] = Query(None, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=100),
+        user_filter: UserFilter = Depends(parse_filter),
+        fields: Optional[Tuple[str, ...]] = Depends(parse_fields),
+) -> FastJSONResponse:
+    if cursor is None and limit is None:
+        rows, total = await user_crud.get_users_page_rows(params, user_filter, fields, versions=True)
+        return page_response(request, rows, total, params, fields)
+
+    if user_filter.sort != ["id"]:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Cursor pagination is ordered by id; sort is only supported with page/size")
+    limit = limit or params.size
+    users = await user_crud.get_users_after(cursor, limit + 1, user_filter, fields, versions=True)
+    return cursor_response(request, users, limit, fields)
+
+@router.get("/export")
+async def export_users(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                       fields: Optional[Tuple[str, ...]] = Depends(parse_fields)) -> StreamingResponse:
+    batches = user_crud.iter_user_batches(fields=fields)
+    return export_response(aexport_stream(batches, export_format, fields or EXPORT_FIELDS), export_format)
+
+@router.get("/batch", response_model=UserBatchResult)
+async def get_users_batch(user_ids: List[int] = Depends(parse_ids)) -> FastJSONResponse:
+    return FastJSONResponse(batch_result(user_ids, await user_crud.get_users_by_ids(user_ids)))
+
+@router.post("/batch", response_model=UserBatchResult)
+async def post_users_batch(user_ids: List[int] = Body(...)) -> FastJSONResponse:
+    return FastJSONResponse(batch_result(user_ids, await user_crud.get_users_by_ids(user_ids)))
+
+@router.post("/bulk", response_model=UserBulkResult, status_code=status.HTTP_201_CREATED)
+async def create_users(users: List[Dict[str, Any]] = Body(...),
+                       errors: Literal["abort", "skip"] = "abort") -> UserBulkResult:
+    valid_users, rejected = validate_users(users)
+    if rejected and errors == "abort":
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=jsonable_encoder(rejected))
+    try:
+        ids = await user_crud.create_users(valid_users)
+    except IntegrityError as e:
+        raise integrity_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    return bulk_result(ids, rejected, len(users))
+
+@router.delete("/bulk", response_model=UserBulkDeleteResult)
+async def delete_users(user_ids: List[int] = Body(...)) -> UserBulkDeleteResult:
+    deleted = await user_crud.delete_users(user_ids)
+    deleted_ids = set(deleted)
+    return UserBulkDeleteResult(deleted=deleted, missing=[user_id for user_id in user_ids if user_id not in deleted_ids])
+
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user(request: Request, user_id: int,
+                   fields: Optional[Tuple[str, ...]] = Depends(parse_fields)) -> Response:
+    if fields:
+        found = await user_crud.get_user_fields(user_id, fields)
+        if not found:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        data, version = found
+        return user_response(request, user_id, version, lambda: data, fields)
+    user = await user_crud.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return user_response(request, user_id, user.version, user.response)
+
+@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def create_user(user: UserCreate) -> FastJSONResponse:
+    try:
+        created_user = await user_crud.create_user(user)
+        return written_response(created_user, status.HTTP_201_CREATED)
+    except IntegrityError as e:
+        raise integrity_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.patch("/{user_id}", response_model=UserResponse)
+async def update_user(user_id: int, user_update: UserUpdate,
+                      versions: Optional[Set[int]] = Depends(if_match_versions)) -> FastJSONResponse:
+    try:
+        user = await user_crud.update_user(user_id, user_update, versions)
+    except IntegrityError as e:
+        raise integrity_error(e)
+    except user_crud.VersionMismatch:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=VERSION_MISMATCH)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return written_response(user)
+
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user(user_id: int, versions: Optional[Set[int]] = Depends(if_match_versions)) -> None:
+    try:
+        success = await user_crud.delete_user(user_id, versions)
+    except user_crud.VersionMismatch:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=VERSION_MISMATCH)
+    if not success:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
\ No newline at end of file
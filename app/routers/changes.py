@@ -0,0 +1,70 @@
+"""Server-Sent Events feed of user changes.
+
+Lives on its own router so a long-lived stream neither holds an admission
+slot of the users routes nor needs a database connection: events come from
+the in-process change bus. A client resumes with ``Last-Event-ID`` (or
+``?since=``); if the events after that id have left the ring buffer it gets
+a ``reset`` event first and should reload what it caches. A client that
+falls too far behind gets an ``overflow`` event and the stream ends; it
+reconnects with the last id it saw.
+"""
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import changes
+from app.database.changes import ChangeEvent
+from app.metrics import MetricsRoute
+
+KEEPALIVE_INTERVAL = 15
+
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=MetricsRoute)
+
+
+def format_event(event: ChangeEvent) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {event.to_json()}\n\n"
+
+
+def format_control(name: str, **data) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(last_event_id: int, idle_timeout: Optional[float]) -> AsyncIterator[str]:
+    # Subscribing only once the body is being sent means a response that is never
+    # sent (the client went away first) leaves no subscription behind.
+    subscription = changes.change_bus.subscribe(last_event_id)
+    try:
+        if subscription.gap:
+            yield format_control("reset", last_id=subscription.head)
+        for event in subscription.replay:
+            yield format_event(event)
+        while True:
+            if subscription.overflowed and subscription.queue.empty():
+                yield format_control("overflow")
+                return
+            event = await subscription.get(idle_timeout if idle_timeout is not None else KEEPALIVE_INTERVAL)
+            if event is not None:
+                yield format_event(event)
+            elif idle_timeout is not None:
+                return
+            else:
+                # Comments keep proxies from closing the connection and surface disconnects.
+                yield ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+@router.get("/changes")
+async def user_changes(
+    last_event_id: Optional[int] = Header(None),
+    since: Optional[int] = Query(None, description="Resume after this event id; Last-Event-ID takes precedence"),
+    idle_timeout: Optional[float] = Query(None, ge=0, description="Close the stream after this many idle seconds"),
+) -> StreamingResponse:
+    head = changes.change_bus.last_id
+    resume = last_event_id if last_event_id is not None else since
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Last-Event-ID": str(head)}
+    # A new client resumes from the head it was told about, so nothing published meanwhile is lost.
+    return StreamingResponse(event_stream(resume if resume is not None else head, idle_timeout),
+                             media_type="text/event-stream", headers=headers)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
 
+from app import metrics
+from app.database import cache
 from app.database.engine import check_availability
+from app.metrics import MetricsRoute
 
-router = APIRouter()
+router = APIRouter(route_class=MetricsRoute)
 
 
 @router.get("/health")
@@ -11,5 +15,14 @@ def health_check():
 
 @router.get("/status")
 def status_check():
-    check_availability()
-    return {"status": "ok"}
\ No newline at end of file
+    if not check_availability():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database unavailable")
+    return {"status": "ok"}
+
+@router.get("/cache")
+def cache_stats():
+    return cache.user_cache.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> str:
+    return metrics.render()
@@ -1,39 +1,247 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi_pagination import Page, paginate
+import csv
+import io
+import json
+from typing import (Any, AsyncIterator, Callable, Dict, Iterator, List, Literal, Optional, Sequence, Set, Tuple,
+                    Union)
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi_pagination import Page, Params
+from pydantic import ValidationError
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
+from app.admission import AdmissionRoute, users_controller
 from app.database import users as user_crud
-from app.models.User import UserCreate, UserUpdate, UserResponse, User
+from app.database.engine import reset_read_your_writes
+from app.etags import fields_key, if_match_versions, none_match, not_modified, rows_etag, user_etag
+from app.metrics import MetricsRoute
+from app.models.User import (UserCreate, UserUpdate, UserResponse, UserCursorPage, UserBulkError, UserBulkResult,
+                             UserBulkDeleteResult, UserBatchResult, UserFilter, VersionedUser, USER_FIELDS,
+                             USER_SORT_KEYS)
+from app.profiling import ProfiledRoute
+from app.responses import FastJSONResponse
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+class UsersRoute(MetricsRoute, AdmissionRoute, ProfiledRoute):
+    # Metrics wrap admission control, so shed requests and time spent queued are measured too.
+    controller = users_controller
 
-@router.get("/", response_model=Page[UserResponse])
-def get_users() -> Page[UserResponse]:
-    all_users = user_crud.get_users()
-    return paginate(all_users)
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=UsersRoute,
+                   dependencies=[Depends(reset_read_your_writes)])
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FIELDS = USER_FIELDS
+EMAIL_CONFLICT = "User with this email already exists"
+VERSION_MISMATCH = "User has changed since it was read"
+
+def integrity_error(error: IntegrityError) -> HTTPException:
+    if user_crud.is_email_conflict(error):
+        return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=EMAIL_CONFLICT)
+    return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(error))
+
+def serialize_batch(batch: List[Dict[str, Any]], export_format: str, fields: Sequence[str] = EXPORT_FIELDS) -> str:
+    if export_format == "ndjson":
+        return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fieldnames=fields).writerows(batch)
+    return buffer.getvalue()
+
+def export_header(export_format: str, fields: Sequence[str] = EXPORT_FIELDS) -> str:
+    return ",".join(fields) + "\r\n" if export_format == "csv" else ""
+
+def export_stream(batches: Iterator[List[Dict[str, Any]]], export_format: str,
+                  fields: Sequence[str] = EXPORT_FIELDS) -> Iterator[str]:
+    yield export_header(export_format, fields)
+    for batch in batches:
+        yield serialize_batch(batch, export_format, fields)
+
+async def aexport_stream(batches: AsyncIterator[List[Dict[str, Any]]], export_format: str,
+                         fields: Sequence[str] = EXPORT_FIELDS) -> AsyncIterator[str]:
+    yield export_header(export_format, fields)
+    async for batch in batches:
+        yield serialize_batch(batch, export_format, fields)
+
+def export_response(stream: Union[Iterator[str], AsyncIterator[str]], export_format: str) -> StreamingResponse:
+    return StreamingResponse(stream, media_type=EXPORT_MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition": f'attachment; filename="users.{export_format}"'})
+
+def validate_users(items: List[Dict[str, Any]]) -> Tuple[List[UserCreate], List[UserBulkError]]:
+    users, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            users.append(UserCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append(UserBulkError(index=index, detail=e.errors(include_url=False, include_context=False)))
+    return users, errors
+
+def parse_ids(ids: str = Query(..., description="Comma-separated user ids")) -> List[int]:
+    try:
+        return [int(user_id) for user_id in ids.split(",") if user_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="ids must be integers")
+
+def parse_filter(
+        email: Optional[str] = Query(None, description="Exact email"),
+        last_name: Optional[str] = Query(None, description="Case-insensitive last name prefix"),
+        first_name: Optional[str] = Query(None, description="Case-insensitive first name prefix"),
+        sort: str = Query("id", description=f"Comma-separated keys from {', '.join(USER_SORT_KEYS)}; "
+                                            f"prefix with - for descending"),
+) -> UserFilter:
+    keys = [key.strip() for key in sort.split(",") if key.strip()]
+    unknown = [key for key in keys if key.lstrip("-") not in USER_SORT_KEYS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Unknown sort keys: {', '.join(unknown)}")
+    return UserFilter(email=email, last_name=last_name, first_name=first_name, sort=keys or ["id"])
+
+def parse_fields(
+        fields: Optional[str] = Query(None, description=f"Comma-separated subset of {', '.join(USER_FIELDS)}"),
+) -> Optional[Tuple[str, ...]]:
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in USER_FIELDS]
+    if unknown or not names:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "fields is empty")
+    return tuple(dict.fromkeys(names))
+
+def cursor_page(users: List[Row], limit: int) -> Dict[str, Any]:
+    # Rows carry the version columns, so the cursor is there even when id is not a requested field.
+    next_cursor = users[limit - 1].etag_id if len(users) > limit else None
+    return {"data": user_crud.row_dicts(users[:limit], versions=True), "next_cursor": next_cursor}
+
+def page_response(request: Request, rows: List[Row], total: int, params: Params,
+                  fields: Optional[Tuple[str, ...]]) -> Response:
+    etag = rows_etag(user_crud.row_versions(rows), total, params.page, params.size, fields_key(fields))
+    if none_match(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(user_crud.page_result(rows, total, params, versions=True), headers={"ETag": etag})
+
+def cursor_response(request: Request, users: List[Row], limit: int, fields: Optional[Tuple[str, ...]]) -> Response:
+    # The extra row fetched to find the next cursor is hashed too: it decides next_cursor.
+    etag = rows_etag(user_crud.row_versions(users), limit, fields_key(fields))
+    if none_match(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(cursor_page(users, limit), headers={"ETag": etag})
+
+def user_response(request: Request, user_id: int, version: int, content: Callable[[], Dict[str, Any]],
+                  fields: Optional[Tuple[str, ...]] = None) -> Response:
+    etag = user_etag(user_id, version, fields)
+    if none_match(request, etag):
+        return not_modified(etag)
+    return FastJSONResponse(content(), headers={"ETag": etag})
+
+def written_response(user: VersionedUser, status_code: int = status.HTTP_200_OK) -> FastJSONResponse:
+    headers = {"ETag": user_etag(user.id, user.version)}
+    return FastJSONResponse(user.response(), status_code=status_code, headers=headers)
+
+def batch_result(user_ids: List[int], users: List[Row]) -> Dict[str, Any]:
+    by_id = {user.id: user for user in users}
+    return {"data": [dict(by_id[user_id]._mapping) for user_id in user_ids if user_id in by_id],
+            "missing": [user_id for user_id in user_ids if user_id not in by_id]}
+
+def bulk_result(ids: List[int], errors: List[UserBulkError], total: int) -> UserBulkResult:
+    rejected = {error.index for error in errors}
+    created = iter(ids)
+    return UserBulkResult(ids=[None if index in rejected else next(created) for index in range(total)],
+                          errors=errors)
+
+@router.get("/", response_model=Union[UserCursorPage, Page[UserResponse]])
+def get_users(
+        request: Request,
+        params: Params = Depends(),
+        cursor: Optional[int] = Query(None, ge=0),
+        limit: Optional[int] = Query(None, ge=1, le=100),
+        user_filter: UserFilter = Depends(parse_filter),
+        fields: Optional[Tuple[str, ...]] = Depends(parse_fields),
+) -> FastJSONResponse:
+    if cursor is None and limit is None:
+        rows, total = user_crud.get_users_page_rows(params, user_filter, fields, versions=True)
+        return page_response(request, rows, total, params, fields)
+
+    if user_filter.sort != ["id"]:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Cursor pagination is ordered by id; sort is only supported with page/size")
+    limit = limit or params.size
+    users = user_crud.get_users_after(cursor, limit + 1, user_filter, fields, versions=True)
+    return cursor_response(request, users, limit, fields)
+
+@router.get("/export")
+def export_users(export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+                 fields: Optional[Tuple[str, ...]] = Depends(parse_fields)) -> StreamingResponse:
+    batches = user_crud.iter_user_batches(fields=fields)
+    return export_response(export_stream(batches, export_format, fields or EXPORT_FIELDS), export_format)
+
+@router.get("/batch", response_model=UserBatchResult)
+def get_users_batch(user_ids: List[int] = Depends(parse_ids)) -> FastJSONResponse:
+    return FastJSONResponse(batch_result(user_ids, user_crud.get_users_by_ids(user_ids)))
+
+@router.post("/batch", response_model=UserBatchResult)
+def post_users_batch(user_ids: List[int] = Body(...)) -> FastJSONResponse:
+    return FastJSONResponse(batch_result(user_ids, user_crud.get_users_by_ids(user_ids)))
+
+@router.post("/bulk", response_model=UserBulkResult, status_code=status.HTTP_201_CREATED)
+def create_users(users: List[Dict[str, Any]] = Body(...),
+                 errors: Literal["abort", "skip"] = "abort") -> UserBulkResult:
+    valid_users, rejected = validate_users(users)
+    if rejected and errors == "abort":
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=jsonable_encoder(rejected))
+    try:
+        ids = user_crud.create_users(valid_users)
+    except IntegrityError as e:
+        raise integrity_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    return bulk_result(ids, rejected, len(users))
+
+@router.delete("/bulk", response_model=UserBulkDeleteResult)
+def delete_users(user_ids: List[int] = Body(...)) -> UserBulkDeleteResult:
+    deleted = user_crud.delete_users(user_ids)
+    deleted_ids = set(deleted)
+    return UserBulkDeleteResult(deleted=deleted, missing=[user_id for user_id in user_ids if user_id not in deleted_ids])
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int) -> UserResponse:
+def get_user(request: Request, user_id: int,
+             fields: Optional[Tuple[str, ...]] = Depends(parse_fields)) -> Response:
+    if fields:
+        found = user_crud.get_user_fields(user_id, fields)
+        if not found:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        data, version = found
+        return user_response(request, user_id, version, lambda: data, fields)
     user = user_crud.get_user(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return UserResponse.model_validate(user)
+    return user_response(request, user_id, user.version, user.response)
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate) -> UserResponse:
+def create_user(user: UserCreate) -> FastJSONResponse:
     try:
         created_user = user_crud.create_user(user)
-        return created_user
+        return written_response(created_user, status.HTTP_201_CREATED)
+    except IntegrityError as e:
+        raise integrity_error(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.patch("/{user_id}", response_model=UserResponse)
-def update_user(user_id: int, user_update: UserUpdate) -> UserResponse:
-    user = user_crud.update_user(user_id, user_update)
+def update_user(user_id: int, user_update: UserUpdate,
+                versions: Optional[Set[int]] = Depends(if_match_versions)) -> FastJSONResponse:
+    try:
+        user = user_crud.update_user(user_id, user_update, versions)
+    except IntegrityError as e:
+        raise integrity_error(e)
+    except user_crud.VersionMismatch:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=VERSION_MISMATCH)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return UserResponse.model_validate(user)
+    return written_response(user)
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: int) -> None:
-    success = user_crud.delete_user(user_id)
+def delete_user(user_id: int, versions: Optional[Set[int]] = Depends(if_match_versions)) -> None:
+    try:
+        success = user_crud.delete_user(user_id, versions)
+    except user_crud.VersionMismatch:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=VERSION_MISMATCH)
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
\ No newline at end of file
@@ -1,5 +1,11 @@
+from typing import Any as AnyType, Dict, List
+
+from pydantic import ConfigDict, EmailStr, TypeAdapter, ValidationError
+from typing_extensions import TypedDict
 from voluptuous import Schema, All, Length, PREVENT_EXTRA, Any
 
+from app.models.User import UserResponse
+
 user = Schema(
     {
         "id": int,
@@ -23,4 +29,47 @@ response_list_users = Schema(
             "url": str,
             "text": str
         }
-    })
\ No newline at end of file
+    })
+
+# Wire shape of UserResponse checked the way the voluptuous ``user`` schema
+# does: exact keys and types. The email format is the server's concern, and
+# EmailStr would cost about a hundred times more than the str check.
+UserDict = TypedDict("UserDict", {
+    name: str if field.annotation is EmailStr else field.annotation
+    for name, field in UserResponse.model_fields.items()
+})
+UserDict.__pydantic_config__ = ConfigDict(strict=True, extra="forbid")
+
+users = TypeAdapter(List[UserDict])
+
+
+class ListValidator:
+    """Validates a page envelope whose ``key`` holds a homogeneous list.
+
+    The list is checked in one pass by ``items`` (a pydantic ``TypeAdapter``)
+    and the rest of the envelope by a voluptuous schema compiled once from
+    ``schema``. When the fast path rejects the payload, ``schema`` validates
+    the whole payload so callers get the same voluptuous errors as before.
+    """
+
+    def __init__(self, schema: Schema, items: TypeAdapter, key: str = "data", min_items: int = 0):
+        self.schema = schema
+        self.items = items
+        self.key = key
+        self.min_items = min_items
+        self.envelope = Schema({k: v for k, v in schema.schema.items() if k != key},
+                               extra=schema.extra, required=schema.required)
+
+    def __call__(self, payload: AnyType) -> Dict[str, AnyType]:
+        data = payload.get(self.key) if isinstance(payload, dict) else None
+        if not isinstance(data, list) or len(data) < self.min_items:
+            return self.schema(payload)
+        try:
+            data = self.items.validate_python(data)
+        except ValidationError:
+            return self.schema(payload)
+        envelope = self.envelope({k: v for k, v in payload.items() if k != self.key})
+        return {**envelope, self.key: data}
+
+
+list_users = ListValidator(response_list_users, users, min_items=7)
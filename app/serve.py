@@ -0,0 +1,70 @@
+"""Production launcher for the users API.
+
+    python -m app.serve --workers 4 --port 8002
+
+Creates the tables once, then runs ``app.main:app`` under uvicorn's process
+supervisor. Workers are spawned and import the app themselves, so each one
+opens its own engine and pool; forked workers (e.g. gunicorn ``--preload``)
+get fresh pools from the ``register_at_fork`` hooks in the engine modules.
+uvloop and httptools are used when they are installed.
+"""
+import argparse
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from app.models.User import User  # noqa: F401  registers the table created below
+from app.database.engine import create_db_and_tables, dispose_engines
+from app.settings import cache_settings, changes_settings
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def pick(choice: str, fast: str, fallback: str) -> str:
+    if choice != "auto":
+        return choice
+    return fast if importlib.util.find_spec(fast) is not None else fallback
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the users API with several worker processes")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--workers", type=int, default=default_workers(), help="default: usable CPU count")
+    parser.add_argument("--loop", choices=["auto", "uvloop", "asyncio"], default="auto")
+    parser.add_argument("--http", choices=["auto", "httptools", "h11"], default="auto")
+    parser.add_argument("--graceful-timeout", type=float, default=30,
+                        help="seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # uvicorn configures only its own loggers; this covers the supervisor's messages.
+    logging.basicConfig(format="%(levelname)s:     %(message)s")
+    logger.setLevel(logging.INFO)
+    loop = pick(args.loop, "uvloop", "asyncio")
+    http = pick(args.http, "httptools", "h11")
+    if args.workers > 1 and cache_settings.backend.lower() == "memory":
+        logger.warning("USER_CACHE=memory is per process, so a write in one worker leaves the others stale "
+                       "for up to USER_CACHE_TTL seconds")
+    if args.workers > 1 and changes_settings.backend.lower() == "memory":
+        logger.warning("CHANGES_BACKEND=memory is per process, so /api/users/changes only sees writes handled "
+                       "by the same worker; use CHANGES_BACKEND=postgres")
+    logger.info("Starting %d worker(s), loop=%s, http=%s", args.workers, loop, http)
+
+    create_db_and_tables()
+    # The supervisor serves no requests; it should not keep the connection opened above.
+    dispose_engines()
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, loop=loop, http=http,
+                timeout_graceful_shutdown=args.graceful_timeout, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+from typing import Annotated, Dict, List, Optional
+
+from dotenv import load_dotenv
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
+
+load_dotenv()
+
+
+class DatabaseSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="DATABASE_", env_ignore_empty=True, extra="ignore")
+
+    engine: str
+    async_engine: Optional[str] = None
+    use_async: bool = Field(False, validation_alias="DATABASE_ASYNC")
+    replicas: Annotated[List[str], NoDecode] = []
+
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    connect_timeout: int = 10
+    statement_timeout_ms: Optional[int] = None
+
+    bulk_chunk_size: int = 1000
+    export_batch_size: int = 1000
+
+    # Group commit for POST /api/users/: 0 disables it, otherwise the most a create waits for others to join.
+    coalesce_window_ms: float = 0
+    coalesce_max_batch: int = 100
+
+    @field_validator("replicas", mode="before")
+    @classmethod
+    def split_replicas(cls, value):
+        if isinstance(value, str):
+            return [url.strip() for url in value.split(",") if url.strip()]
+        return value
+
+
+database_settings = DatabaseSettings()
+
+
+class MetricsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="METRICS_", env_ignore_empty=True, extra="ignore")
+
+    enabled: bool = True
+
+
+metrics_settings = MetricsSettings()
+
+
+class CacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="USER_CACHE_", env_ignore_empty=True, extra="ignore")
+
+    # "none" or "memory" (an LRU per process).
+    backend: str = Field("none", validation_alias="USER_CACHE")
+    size: int = 10000
+    ttl: float = 60
+
+
+cache_settings = CacheSettings()
+
+
+class AdmissionSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="ADMISSION_", env_ignore_empty=True, extra="ignore")
+
+    enabled: bool = True
+    # Requests served at once by the users routes; defaults to the connections the pool can open.
+    limit: Optional[int] = None
+    queue_size: int = 100
+    queue_timeout: float = 2
+    retry_after: int = 1
+    # "GET /api/users/export=2,POST /api/users/bulk=4": tighter limits for individual routes.
+    route_limits: Annotated[Dict[str, int], NoDecode] = {}
+
+    @field_validator("route_limits", mode="before")
+    @classmethod
+    def split_route_limits(cls, value):
+        if isinstance(value, str):
+            pairs = (item.rsplit("=", 1) for item in value.split(",") if item.strip())
+            return {" ".join(route.split()): int(limit) for route, limit in pairs}
+        return value
+
+
+admission_settings = AdmissionSettings()
+
+
+class ProfilingSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="PROFILING_", env_ignore_empty=True, extra="ignore")
+
+    enabled: bool = False
+    slow_ms: float = 500
+    # More runs of one statement shape in a request than this is reported as a likely N+1.
+    repeated_statements: int = 10
+    cprofile_route: Optional[str] = None
+    cprofile_sample_rate: float = 0.01
+    cprofile_dir: str = "profiles"
+
+
+profiling_settings = ProfilingSettings()
+
+
+class ChangesSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="CHANGES_", env_ignore_empty=True, extra="ignore")
+
+    # "memory" is per process; "postgres" shares the feed between workers through LISTEN/NOTIFY.
+    backend: str = "memory"
+    buffer_size: int = 1000
+    queue_size: int = 100
+
+
+changes_settings = ChangesSettings()
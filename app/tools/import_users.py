@@ -0,0 +1,239 @@
+"""Import users from JSON arrays, NDJSON or CSV files straight into the database.
+
+    python -m app.tools.import_users users.json
+    python -m app.tools.import_users users.ndjson --batch-size 5000 --workers 4 --rejected rejected.ndjson
+    python -m app.tools.import_users --generate 1000000 --output synthetic.ndjson
+
+Records that fail validation, and records whose insert conflicts (a taken
+email), are skipped and written to ``--rejected``; the rest are imported.
+"""
+import argparse
+import collections
+import contextlib
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+
+from app.models.User import UserCreate
+
+FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+FIRST_NAMES = ("George", "Janet", "Emma", "Eve", "Charles", "Tracey", "Michael", "Lindsay", "Tobias", "Byron")
+LAST_NAMES = ("Bluth", "Weaver", "Wong", "Holt", "Morris", "Ramos", "Lawson", "Ferguson", "Funke", "Fields")
+
+
+def iter_json_array(stream: IO[str], chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            if end == len(buffer) and chunk:
+                break  # a scalar cut at the chunk boundary would decode as a shorter value
+            position = end
+            yield item
+        if not chunk:
+            raise ValueError("Unterminated JSON array")
+
+
+def iter_ndjson(stream: IO[str]) -> Iterator[Any]:
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    for row in csv.DictReader(stream):
+        yield {key: value or None for key, value in row.items()}
+
+
+READERS = {"json": iter_json_array, "ndjson": iter_ndjson, "csv": iter_csv}
+
+
+def generate_users(count: int, start: int = 0) -> Iterator[Dict[str, Any]]:
+    for i in range(start, start + count):
+        first_name, last_name = FIRST_NAMES[i % len(FIRST_NAMES)], LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]
+        yield {
+            "email": f"{first_name.lower()}.{last_name.lower()}.{i}@reqres.in",
+            "first_name": first_name,
+            "last_name": last_name,
+            "avatar": f"https://reqres.in/img/faces/{i % 12 + 1}-image.jpg",
+        }
+
+
+def write_users(users: Iterable[Dict[str, Any]], stream: IO[str], export_format: str) -> int:
+    count = 0
+    if export_format == "csv":
+        writer = csv.DictWriter(stream, fieldnames=("email", "first_name", "last_name", "avatar"))
+        writer.writeheader()
+        for count, user in enumerate(users, 1):
+            writer.writerow(user)
+    elif export_format == "ndjson":
+        for count, user in enumerate(users, 1):
+            stream.write(json.dumps(user) + "\n")
+    else:
+        stream.write("[")
+        for count, user in enumerate(users, 1):
+            stream.write(("," if count > 1 else "") + "\n  " + json.dumps(user))
+        stream.write("\n]\n")
+    return count
+
+
+def validate_batch(batch: List[Tuple[int, Any]]) -> Tuple[List[Tuple[int, UserCreate]], List[Dict[str, Any]]]:
+    users, rejected = [], []
+    for index, record in batch:
+        try:
+            users.append((index, UserCreate.model_validate(record)))
+        except ValidationError as e:
+            rejected.append({"index": index, "record": record,
+                             "errors": e.errors(include_url=False, include_context=False)})
+    return users, rejected
+
+
+def batched(records: Iterable[Any], size: int) -> Iterator[List[Tuple[int, Any]]]:
+    numbered = enumerate(records)
+    while batch := list(itertools.islice(numbered, size)):
+        yield batch
+
+
+class Progress:
+    def __init__(self, out: IO[str], every: float = 1.0):
+        self.out = out
+        self.every = every
+        self.started = self.reported = time.perf_counter()
+        self.imported = 0
+        self.rejected = 0
+
+    def update(self, imported: int, rejected: int, force: bool = False) -> None:
+        self.imported += imported
+        self.rejected += rejected
+        now = time.perf_counter()
+        if force or now - self.reported >= self.every:
+            self.reported = now
+            print(f"imported={self.imported} rejected={self.rejected} "
+                  f"rate={self.imported / max(now - self.started, 1e-9):.0f} rows/s", file=self.out)
+
+
+def map_bounded(executor, fn, iterable: Iterable[Any], window: int) -> Iterator[Any]:
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def insert_batch(users: List[Tuple[int, UserCreate]], batch_size: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """Insert a validated batch; if it conflicts, retry it row by row and reject the rows that still do."""
+    from app.database import users as user_crud
+
+    try:
+        user_crud.create_users([user for _, user in users], chunk_size=batch_size)
+        return len(users), []
+    except IntegrityError:
+        pass
+    imported, rejected = 0, []
+    for index, user in users:
+        try:
+            user_crud.create_users([user])
+            imported += 1
+        except IntegrityError as e:
+            rejected.append({"index": index, "record": user.model_dump(),
+                             "errors": [{"type": "integrity_error", "msg": str(e.orig)}]})
+    return imported, rejected
+
+
+def import_users(records: Iterable[Any], batch_size: int = 1000, workers: int = 1,
+                 rejected_out: Optional[IO[str]] = None, progress: Optional[Progress] = None) -> Tuple[int, int]:
+    progress = progress or Progress(sys.stderr)
+    batches = batched(records, batch_size)
+    with contextlib.ExitStack() as stack:
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(workers))
+            results = map_bounded(executor, validate_batch, batches, workers * 2)
+        else:
+            results = map(validate_batch, batches)
+        for users, rejected in results:
+            imported = 0
+            if users:
+                imported, conflicts = insert_batch(users, batch_size)
+                rejected.extend(conflicts)
+            if rejected_out:
+                for rejection in rejected:
+                    rejected_out.write(json.dumps(rejection, default=str) + "\n")
+            progress.update(imported, len(rejected))
+    progress.update(0, 0, force=True)
+    return progress.imported, progress.rejected
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import users into the database")
+    parser.add_argument("path", nargs="?", help="JSON array, NDJSON or CSV file; '-' for stdin")
+    parser.add_argument("--format", choices=sorted(READERS), help="input/output format, detected from the extension")
+    parser.add_argument("--batch-size", type=int, help="rows per insert, default: DATABASE_BULK_CHUNK_SIZE")
+    parser.add_argument("--workers", type=int, default=1, help="processes used for validation")
+    parser.add_argument("--rejected", help="write rejected records as NDJSON to this file")
+    parser.add_argument("--generate", type=int, metavar="N", help="generate N synthetic users instead of reading")
+    parser.add_argument("--output", help="with --generate: write the users to this file instead of importing")
+    args = parser.parse_args(argv)
+
+    if args.path is None and args.generate is None:
+        parser.error("either a path or --generate is required")
+    target = args.output or args.path or ""
+    export_format = args.format or FORMATS.get(os.path.splitext(target)[1].lower(), "ndjson")
+
+    if args.generate is not None and args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = write_users(generate_users(args.generate), out, export_format)
+        print(f"generated={count} path={args.output}", file=sys.stderr)
+        return 0
+
+    from app.database.engine import create_db_and_tables
+    from app.settings import database_settings
+    create_db_and_tables()
+    batch_size = args.batch_size or database_settings.bulk_chunk_size
+
+    rejected_out = open(args.rejected, "w", encoding="utf-8") if args.rejected else None
+    try:
+        if args.generate is not None:
+            records = generate_users(args.generate)
+            imported, rejected = import_users(records, batch_size, args.workers, rejected_out)
+        else:
+            stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+            with stream:
+                records = READERS[export_format](stream)
+                imported, rejected = import_users(records, batch_size, args.workers, rejected_out)
+    finally:
+        if rejected_out:
+            rejected_out.close()
+    return 1 if rejected and not imported else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
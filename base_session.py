@@ -1,18 +1,140 @@
 import logging
+import random
+import socket
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
 
 import curlify
 from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming(NamedTuple):
+    """Phases of one request in seconds; ``dns`` and ``connect`` are 0 on a reused connection."""
+
+    method: str
+    url: str
+    status_code: int
+    dns: float
+    connect: float
+    ttfb: float
+    total: float
+    request_bytes: int
+    response_bytes: int
+
+
+TimingHook = Callable[[RequestTiming], None]
+
+
+class _TimedConnection:
+    dns = 0.0
+    connect_time = 0.0
+
+    def connect(self):
+        # Only the public connect() is wrapped: a lookup just before it times DNS, and the
+        # lookup urllib3 repeats inside connect() is answered from the resolver cache.
+        started = time.perf_counter()
+        try:
+            socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            pass  # connect() raises urllib3's NameResolutionError for it
+        self.dns = time.perf_counter() - started
+        started = time.perf_counter()
+        super().connect()
+        self.connect_time = time.perf_counter() - started
+
+    def pop_timings(self) -> Tuple[float, float]:
+        timings = self.dns, self.connect_time
+        self.dns = self.connect_time = 0.0
+        return timings
+
+
+class TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Adapter whose connections record DNS and connect (TCP + TLS) time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool,
+                                                   "https": TimedHTTPSConnectionPool}
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # The connection goes back to the pool once the body is read, so take the timings now.
+        connection = getattr(response.raw, "connection", None)
+        response.connect_timings = connection.pop_timings() if isinstance(connection, _TimedConnection) else (0.0, 0.0)
+        return response
+
+
+def histogram_hook(histogram) -> TimingHook:
+    """Feed total request time into a histogram with ``observe(value, **labels)``."""
+    return lambda timing: histogram.observe(timing.total, method=timing.method, status=str(timing.status_code))
 
 
 class BaseSession(Session):
-    def __init__(self, *args, **kwargs):
+    """Session that prefixes ``base_url`` and optionally logs and times requests.
+
+    The curl rendering is only done when this module's logger is enabled for
+    INFO, and ``on_timing`` receives a ``RequestTiming`` per request. With
+    ``sample_rate`` below 1 only that fraction of requests is logged and timed.
+    """
+
+    def __init__(self, *args, base_url: Optional[str] = None, on_timing: Optional[TimingHook] = None,
+                 sample_rate: float = 1.0, **kwargs):
         super().__init__()
-        self.base_url = kwargs.get('base_url', None)
+        self.base_url = base_url
+        self.on_timing = on_timing
+        self.sample_rate = sample_rate
+        if on_timing:
+            adapter = TimedHTTPAdapter()
+            self.mount("http://", adapter)
+            self.mount("https://", adapter)
 
     def request(self, method, url, **kwargs):
-        url = self.base_url + url
+        if self.base_url:
+            url = self.base_url + url
+
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        log = sampled and logger.isEnabledFor(logging.INFO)
+        timed = sampled and self.on_timing is not None
+        started = time.perf_counter() if timed else 0.0
 
         response = super().request(method, url, **kwargs)
-        curl = curlify.to_curl(response.request)
-        logging.info(curlify.to_curl(response.request))
-        return
\ No newline at end of file
+
+        if timed:
+            dns, connect = getattr(response, "connect_timings", (0.0, 0.0))
+            body = response.request.body
+            self.on_timing(RequestTiming(
+                method=response.request.method,
+                url=response.url,
+                status_code=response.status_code,
+                dns=dns,
+                connect=connect,
+                ttfb=response.elapsed.total_seconds(),
+                total=time.perf_counter() - started,
+                request_bytes=len(body) if body else 0,
+                response_bytes=len(response.content) if not kwargs.get("stream") else
+                int(response.headers.get("Content-Length", 0)),
+            ))
+        if log:
+            logger.info("%s -> %s", curlify.to_curl(response.request), response.status_code)
+        return response
@@ -0,0 +1,10 @@
+"""Benchmarks for the users service.
+
+Every benchmark runs against a throwaway database: ``BENCH_DATABASE_ENGINE``
+when set, otherwise a fresh SQLite file, so ``DATABASE_ENGINE`` from the
+environment or ``.env`` is never touched.
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_ENGINE"] = os.getenv("BENCH_DATABASE_ENGINE", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
@@ -0,0 +1,203 @@
+"""Load-test the users API and record throughput and tail latency.
+
+    python -m bench --users 10000 --workers 16 --duration 30 --output results.json
+    python -m bench --mix list=10,get=70,create=10,patch=5,delete=5 --compare baseline.json
+
+Boots ``app.main:app`` on a throwaway database (see ``bench/__init__.py``),
+seeds it, drives the mix with concurrent workers and reports requests per
+second and p50/p95/p99 latency per endpoint.
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import requests
+
+from app.database.engine import create_db_and_tables
+from bench.pagination import seed
+from bench.server import serve
+
+DEFAULT_MIX = "list=20,get=50,create=10,patch=10,delete=10"
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    weights = {name: int(weight) for name, weight in (part.split("=") for part in mix.split(","))}
+    unknown = set(weights) - {"list", "get", "create", "patch", "delete"}
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class Worker(threading.Thread):
+    def __init__(self, base_url: str, users: int, mix: Dict[str, int], deadline: float, seed_value: int):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.users = users
+        self.operations, self.weights = zip(*mix.items())
+        self.deadline = deadline
+        self.random = random.Random(seed_value)
+        self.session = requests.Session()
+        self.created: List[int] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def request(self, operation: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.latencies[operation].append(time.perf_counter() - started)
+        if not ok:
+            self.errors[operation] += 1
+        return response if ok else None
+
+    def run(self) -> None:
+        counter = 0
+        while time.perf_counter() < self.deadline:
+            operation = self.random.choices(self.operations, self.weights)[0]
+            if operation == "delete" and not self.created:
+                operation = "create"
+            if operation == "list":
+                self.request("list", "GET", "/api/users/", params={"limit": 50})
+            elif operation == "get":
+                self.request("get", "GET", f"/api/users/{self.random.randint(1, self.users)}")
+            elif operation == "patch":
+                self.request("patch", "PATCH", f"/api/users/{self.random.randint(1, self.users)}",
+                             json={"last_name": f"Patched{counter}"})
+            elif operation == "create":
+                response = self.request("create", "POST", "/api/users/", json={
+                    "email": f"bench.{self.ident}.{counter}@example.com", "first_name": "Bench",
+                    "last_name": "Worker", "avatar": "https://reqres.in/img/faces/1-image.jpg"})
+                if response is not None:
+                    self.created.append(response.json()["id"])
+            else:
+                self.request("delete", "DELETE", f"/api/users/{self.created.pop()}")
+            counter += 1
+
+
+def summarize(workers: List[Worker], elapsed: float) -> Dict[str, Dict[str, float]]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    for worker in workers:
+        for operation, values in worker.latencies.items():
+            latencies[operation].extend(values)
+        for operation, count in worker.errors.items():
+            errors[operation] += count
+    latencies["all"] = [value for values in latencies.values() for value in values]
+    errors["all"] = sum(errors.values())
+
+    summary = {}
+    for operation, values in sorted(latencies.items()):
+        values.sort()
+        summary[operation] = {
+            "requests": len(values),
+            "errors": errors[operation],
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'endpoint':<8} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for operation, stats in summary.items():
+        print(f"{operation:<8} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+
+
+def compare(summary: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> bool:
+    regressed = False
+    print(f"{'endpoint':<8} {'metric':<7} {'baseline':>10} {'current':>10} {'change':>8}")
+    for operation, stats in summary.items():
+        for metric, higher_is_better in (("rps", True), ("p95_ms", False), ("p99_ms", False)):
+            old = baseline.get(operation, {}).get(metric)
+            if not old:
+                continue
+            change = (stats[metric] - old) / old
+            worse = -change if higher_is_better else change
+            flag = " !" if worse > threshold else ""
+            regressed |= worse > threshold
+            print(f"{operation:<8} {metric:<7} {old:>10.2f} {stats[metric]:>10.2f} {change:>+7.1%}{flag}")
+    return regressed
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the users API")
+    parser.add_argument("--users", type=int, default=10000, help="users seeded before the run")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent client workers")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to drive load")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds of load discarded before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--server-arg", action="append", default=[], help="extra uvicorn argument")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra server environment")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported as regression")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    create_db_and_tables()
+    seed(args.users)
+    env = dict(item.split("=", 1) for item in args.env)
+    with serve(env, args=args.server_arg) as base_url:
+        if args.warmup:
+            warmup = [Worker(base_url, args.users, {"get": 1}, time.perf_counter() + args.warmup, i)
+                      for i in range(args.workers)]
+            for worker in warmup:
+                worker.start()
+            for worker in warmup:
+                worker.join()
+        started = time.perf_counter()
+        workers = [Worker(base_url, args.users, mix, started + args.duration, i) for i in range(args.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+    summary = summarize(workers, elapsed)
+    print_summary(summary)
+    result = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"users": args.users, "workers": args.workers, "duration": args.duration, "mix": mix,
+                   "env": env, "server_args": args.server_arg},
+        "results": summary,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        if compare(summary, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
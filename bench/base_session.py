@@ -0,0 +1,67 @@
+"""Per-request overhead of BaseSession logging and timing against an in-memory adapter.
+
+    python -m bench.base_session --requests 500 --rounds 30
+
+The adapter answers without any I/O, so the numbers are the client-side
+cost alone: plain ``requests.Session``, ``BaseSession`` with logging off,
+with INFO logging on (curl rendered every request), with a timing hook, and
+with logging sampled at 1%.
+"""
+import argparse
+import logging
+import time
+
+import requests
+from requests.adapters import BaseAdapter
+
+import base_session
+from base_session import BaseSession
+
+
+class StaticAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"id": 1}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def per_request_us(session: requests.Session, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        session.request("POST", "http://bench/api/users/", json={"first_name": "Janet"})
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def run(count: int, rounds: int) -> None:
+    logging.basicConfig(handlers=[logging.NullHandler()])
+    cases = [("requests.Session", requests.Session(), logging.WARNING),
+             ("BaseSession, logging off", BaseSession(), logging.WARNING),
+             ("BaseSession, logging on", BaseSession(), logging.INFO),
+             ("BaseSession, logging 1% sampled", BaseSession(sample_rate=0.01), logging.INFO),
+             ("BaseSession, timing hook", BaseSession(on_timing=lambda timing: None), logging.WARNING)]
+    best = [float("inf")] * len(cases)
+    # Rounds are interleaved across cases so machine noise hits all of them alike.
+    for _ in range(rounds):
+        for i, (name, session, level) in enumerate(cases):
+            session.trust_env = False
+            session.mount("http://", StaticAdapter())
+            base_session.logger.setLevel(level)
+            best[i] = min(best[i], per_request_us(session, count))
+    baseline = best[0]
+    print(f"{'session':<34} {'us/request':>11} {'overhead':>9}")
+    for (name, _, _), cost in zip(cases, best):
+        print(f"{name:<34} {cost:>11.1f} {(cost - baseline) / baseline:>+8.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=30, help="best of this many rounds is reported")
+    args = parser.parse_args()
+    run(args.requests, args.rounds)
@@ -0,0 +1,41 @@
+"""N single GET /api/users/{id} calls vs one GET /api/users/batch call.
+
+    python -m bench.batch_read --users 10000 --ids 10,50,500
+"""
+import argparse
+import random
+import time
+
+from app.api.users_client import UserApiClient
+from app.database.engine import create_db_and_tables
+from bench.pagination import seed
+from bench.server import serve
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(users: int, sizes, repeat: int) -> None:
+    create_db_and_tables()
+    seed(users)
+    with serve({}) as base_url:
+        client = UserApiClient(base_url)
+        print(f"{'ids':>6} {'single GETs ms':>15} {'batch ms':>10}")
+        for size in sizes:
+            ids = random.sample(range(1, users + 1), size)
+            single = timed(lambda: [client.get_user(user_id) for user_id in ids], repeat)
+            batch = timed(lambda: client.get_users_many(ids), repeat)
+            print(f"{size:>6} {single:>15.2f} {batch:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--ids", default="10,50,500")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.users, [int(size) for size in args.ids.split(",")], args.repeat)
@@ -0,0 +1,78 @@
+"""Create throughput and commit rate with and without group commit.
+
+    python -m bench.coalescing --threads 32 --windows 0,1,2,5 --duration 5
+
+Each thread creates users back to back through the sync CRUD, as the
+threadpool does for concurrent POST /api/users/ requests. Window 0 is the
+plain path (one commit per user); other windows go through a
+``WriteCoalescer`` with that ``max_delay``.
+"""
+import argparse
+import itertools
+import threading
+import time
+
+from sqlalchemy import delete, event
+
+from app.database import users as user_crud
+from app.database.coalescer import WriteCoalescer
+from app.database.engine import create_db_and_tables, engine
+from app.models.User import User, UserCreate
+from bench.__main__ import percentile
+
+
+def run_window(window_ms: float, threads: int, max_batch: int, duration: float):
+    create = user_crud.create_user
+    coalescer = None
+    if window_ms:
+        coalescer = WriteCoalescer(user_crud.create_user_group, max_batch, window_ms / 1000)
+        create = coalescer.submit
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+    latencies = [[] for _ in range(threads)]
+
+    def worker(samples):
+        while time.perf_counter() < deadline:
+            user = UserCreate(email=f"group{next(counter)}@example.com", first_name="Group", last_name="Commit")
+            started = time.perf_counter()
+            create(user)
+            samples.append(time.perf_counter() - started)
+
+    commits = []
+
+    def listener(conn):
+        commits.append(1)
+
+    event.listen(engine, "commit", listener)
+    workers = [threading.Thread(target=worker, args=(samples,)) for samples in latencies]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    event.remove(engine, "commit", listener)
+
+    values = sorted(value for samples in latencies for value in samples)
+    return len(values) / elapsed, len(commits) / elapsed, percentile(values, 0.5), percentile(values, 0.99)
+
+
+def run(windows, threads: int, max_batch: int, duration: float) -> None:
+    create_db_and_tables()
+    print(f"{'window ms':>9} {'creates/s':>10} {'commits/s':>10} {'rows/commit':>11} {'p50 ms':>7} {'p99 ms':>7}")
+    for window_ms in windows:
+        with engine.begin() as conn:
+            conn.execute(delete(User))
+        creates, commits, p50, p99 = run_window(window_ms, threads, max_batch, duration)
+        print(f"{window_ms:>9g} {creates:>10.1f} {commits:>10.1f} {creates / commits:>11.1f} "
+              f"{p50 * 1000:>7.2f} {p99 * 1000:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--windows", default="0,1,2,5", help="comma-separated max_delay values in ms")
+    parser.add_argument("--max-batch", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+    run([float(window) for window in args.windows.split(",")], args.threads, args.max_batch, args.duration)
@@ -0,0 +1,53 @@
+"""Throughput of the sync (threadpool) and async users routes under concurrency.
+
+    python -m bench.concurrency --users 1000 --requests 5000 --concurrency 200
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.pagination import seed
+from bench.server import serve
+from app.database.engine import create_db_and_tables
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def drive(base_url: str, users: int, total: int, concurrency: int) -> float:
+    def call(_):
+        response = _session().get(f"{base_url}/api/users/{random.randint(1, users)}")
+        response.raise_for_status()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(call, range(concurrency)))
+        started = time.perf_counter()
+        list(pool.map(call, range(total)))
+    return total / (time.perf_counter() - started)
+
+
+def run(users: int, total: int, concurrency: int) -> None:
+    create_db_and_tables()
+    seed(users)
+    for mode in ("false", "true"):
+        with serve({"DATABASE_ASYNC": mode}) as base_url:
+            rps = drive(base_url, users, total, concurrency)
+        print(f"async={mode:<5} concurrency={concurrency:<5} {rps:>10.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    run(args.users, args.requests, args.concurrency)
@@ -0,0 +1,57 @@
+"""Revalidating unchanged users and pages with ETags against re-downloading them.
+
+    python -m bench.conditional --rows 20000 --size 100
+
+Seeds wide users, boots the app and times plain GETs of a user, an offset
+page and a cursor page against the same GETs sent with ``If-None-Match``,
+which the server answers with an empty 304.
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+from app.database.engine import create_db_and_tables
+from bench.fields import seed_wide
+from bench.server import serve
+
+
+def measure(session: requests.Session, url: str, params: dict, repeat: int, conditional: bool):
+    etag = session.get(url, params=params).headers["ETag"]
+    headers = {"If-None-Match": etag} if conditional else {}
+    timings, size, status = [], 0, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = session.get(url, params=params, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        size, status = len(response.content), response.status_code
+    return status, size, statistics.median(timings)
+
+
+def run(rows: int, size: int, avatar_length: int, repeat: int) -> None:
+    create_db_and_tables()
+    seed_wide(rows, avatar_length)
+    cases = [
+        ("user", "/api/users/1", {}),
+        ("page", "/api/users/", {"page": 2, "size": size}),
+        ("cursor", "/api/users/", {"cursor": size, "limit": size}),
+    ]
+    with serve({}) as base_url, requests.Session() as session:
+        session.trust_env = False
+        print(f"{'request':<8} {'full KB':>8} {'full ms':>8} {'status':>7} {'304 KB':>7} {'304 ms':>7}")
+        for name, path, params in cases:
+            _, full_bytes, full_ms = measure(session, base_url + path, params, repeat, conditional=False)
+            status, cached_bytes, cached_ms = measure(session, base_url + path, params, repeat, conditional=True)
+            print(f"{name:<8} {full_bytes / 1024:>8.1f} {full_ms:>8.2f} {status:>7} "
+                  f"{cached_bytes / 1024:>7.1f} {cached_ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--avatar-length", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.size, args.avatar_length, args.repeat)
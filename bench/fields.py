@@ -0,0 +1,70 @@
+"""Payload size and latency of wide list pages with and without ``?fields=``.
+
+    python -m bench.fields --rows 20000 --size 100 --avatar-length 400
+
+Seeds users with long avatar URLs, boots the app and compares the full page
+against ``fields=id,email`` for page, cursor and export requests.
+"""
+import argparse
+import statistics
+import time
+
+import requests
+from sqlalchemy import delete, insert
+
+from app.database.engine import create_db_and_tables, engine
+from app.models.User import User
+from bench.server import serve
+
+FIELDS = "id,email"
+
+
+def seed_wide(total: int, avatar_length: int, chunk: int = 10_000) -> None:
+    padding = "x" * avatar_length
+    with engine.begin() as conn:
+        conn.execute(delete(User))
+        for offset in range(0, total, chunk):
+            conn.execute(insert(User), [
+                {"email": f"user{i}@example.com", "first_name": "Bench", "last_name": f"User{i}",
+                 "avatar": f"https://example.com/avatars/{i}/{padding}.png"}
+                for i in range(offset, min(offset + chunk, total))
+            ])
+
+
+def measure(session: requests.Session, url: str, params: dict, repeat: int):
+    session.get(url, params=params)
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = session.get(url, params=params)
+        size = len(response.content)
+        timings.append((time.perf_counter() - started) * 1000)
+    return size, statistics.median(timings)
+
+
+def run(rows: int, size: int, avatar_length: int, repeat: int) -> None:
+    create_db_and_tables()
+    seed_wide(rows, avatar_length)
+    cases = [
+        ("page", "/api/users/", {"page": 2, "size": size}, repeat),
+        ("cursor", "/api/users/", {"cursor": size, "limit": size}, repeat),
+        ("export", "/api/users/export", {"format": "ndjson"}, max(3, repeat // 20)),
+    ]
+    with serve({}) as base_url, requests.Session() as session:
+        session.trust_env = False
+        print(f"{'request':<8} {'full KB':>9} {'fields KB':>10} {'full ms':>8} {'fields ms':>10}")
+        for name, path, params, rounds in cases:
+            full_bytes, full_ms = measure(session, base_url + path, params, rounds)
+            sparse_bytes, sparse_ms = measure(session, base_url + path, {**params, "fields": FIELDS}, rounds)
+            print(f"{name:<8} {full_bytes / 1024:>9.1f} {sparse_bytes / 1024:>10.1f} "
+                  f"{full_ms:>8.2f} {sparse_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--avatar-length", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.size, args.avatar_length, args.repeat)
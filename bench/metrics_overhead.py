@@ -0,0 +1,51 @@
+"""Per-request cost of the metrics instrumentation.
+
+    python -m bench.metrics_overhead --requests 3000
+"""
+import argparse
+import time
+
+import requests
+
+from app.database.engine import create_db_and_tables
+from app.metrics import Counter, Gauge, Histogram
+from bench.pagination import seed
+from bench.server import serve
+
+
+def instrumentation_cost(iterations: int) -> float:
+    counter, gauge = Counter("bench_total", ""), Gauge("bench_in_flight", "")
+    histogram = Histogram("bench_seconds", "")
+    started = time.perf_counter()
+    for _ in range(iterations):
+        gauge.inc(route="/api/users/{user_id}", method="GET")
+        histogram.observe(0.003, route="/api/users/{user_id}", method="GET")
+        counter.inc(route="/api/users/{user_id}", method="GET", status="200")
+        gauge.dec(route="/api/users/{user_id}", method="GET")
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def request_latency(base_url: str, total: int) -> float:
+    session = requests.Session()
+    for _ in range(100):
+        session.get(f"{base_url}/api/users/1")
+    started = time.perf_counter()
+    for _ in range(total):
+        session.get(f"{base_url}/api/users/1").raise_for_status()
+    return (time.perf_counter() - started) / total * 1e6
+
+
+def run(total: int) -> None:
+    print(f"instrumentation only: {instrumentation_cost(100_000):.2f} us/request")
+    create_db_and_tables()
+    seed(10)
+    for enabled in ("false", "true"):
+        with serve({"METRICS_ENABLED": enabled}) as base_url:
+            print(f"METRICS_ENABLED={enabled:<5} GET /api/users/1: {request_latency(base_url, total):.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    run(args.requests)
@@ -0,0 +1,58 @@
+"""Per-page latency of keyset vs limit/offset pagination on growing tables.
+
+    python -m bench.pagination --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import time
+
+from fastapi_pagination import Params
+from sqlalchemy import delete, func, insert, select
+
+from app.database import users as user_crud
+from app.database.engine import create_db_and_tables, engine
+from app.models.User import User
+
+
+def seed(total: int, chunk: int = 10_000) -> None:
+    with engine.begin() as conn:
+        start = conn.execute(select(func.count()).select_from(User)).scalar_one()
+        for offset in range(start, total, chunk):
+            conn.execute(insert(User), [
+                {"email": f"user{i}@example.com", "first_name": "Bench", "last_name": f"User{i}",
+                 "avatar": f"https://example.com/avatars/{i}.png"}
+                for i in range(offset, min(offset + chunk, total))
+            ])
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(sizes, page_size: int, repeat: int) -> None:
+    create_db_and_tables()
+    with engine.begin() as conn:
+        conn.execute(delete(User))
+
+    print(f"{'rows':>10} {'depth':>10} {'keyset ms':>10} {'offset ms':>10}")
+    for total in sizes:
+        seed(total)
+        # Last full page: the deepest one the offset endpoint serves, count query included.
+        page = total // page_size
+        depth = (page - 1) * page_size
+        with engine.connect() as conn:
+            cursor = conn.execute(select(User.id).order_by(User.id).offset(depth).limit(1)).scalar_one()
+        keyset = timed(lambda: user_crud.get_users_after(cursor - 1, page_size), repeat)
+        offset = timed(lambda: user_crud.get_users_page_rows(Params(page=page, size=page_size)), repeat)
+        print(f"{total:>10} {depth:>10} {keyset:>10.3f} {offset:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(",")], args.page_size, args.repeat)
@@ -0,0 +1,25 @@
+"""Per-request cost of the SQL profiling middleware.
+
+    python -m bench.profiling_overhead --requests 3000
+"""
+import argparse
+
+from app.database.engine import create_db_and_tables
+from bench.metrics_overhead import request_latency
+from bench.pagination import seed
+from bench.server import serve
+
+
+def run(total: int) -> None:
+    create_db_and_tables()
+    seed(10)
+    for enabled in ("false", "true"):
+        with serve({"PROFILING_ENABLED": enabled, "PROFILING_SLOW_MS": "60000"}) as base_url:
+            print(f"PROFILING_ENABLED={enabled:<5} GET /api/users/1: {request_latency(base_url, total):.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    run(args.requests)
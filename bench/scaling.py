@@ -0,0 +1,78 @@
+"""Requests per second of ``app.serve`` from one worker to one per CPU.
+
+    python -m bench.scaling --workers 1,2,4,8 --clients 8 --duration 10
+
+Boots the launcher once per worker count on the same seeded database and
+drives it with ``--clients`` load processes (threads in one process would be
+bound by the client's own GIL long before the server's). The default mix is
+read-only: writes serialize on SQLite's single writer and would measure the
+database rather than the workers.
+"""
+import argparse
+import multiprocessing
+import time
+
+from app.database.engine import create_db_and_tables
+from app.serve import default_workers
+from bench.__main__ import Worker, parse_mix
+from bench.pagination import seed
+from bench.server import serve
+
+
+def worker_steps(cpus: int) -> str:
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    if cpus > 1:
+        counts.append(cpus)
+    return ",".join(map(str, counts))
+
+
+def drive(base_url: str, users: int, mix: dict, duration: float, threads: int, seed_value: int):
+    deadline = time.perf_counter() + duration
+    workers = [Worker(base_url, users, mix, deadline, seed_value * threads + i) for i in range(threads)]
+    for worker in workers:
+        worker.session.trust_env = False
+        worker.start()
+    for worker in workers:
+        worker.join()
+    requests_done = sum(len(values) for worker in workers for values in worker.latencies.values())
+    errors = sum(count for worker in workers for count in worker.errors.values())
+    return requests_done, errors
+
+
+def run(worker_counts, clients: int, threads: int, users: int, mix: dict, duration: float, warmup: float) -> None:
+    create_db_and_tables()
+    seed(users)
+    context = multiprocessing.get_context("spawn")
+    baseline = None
+    print(f"{'workers':>7} {'rps':>9} {'errors':>7} {'speedup':>8} {'efficiency':>10}")
+    with context.Pool(clients) as pool:
+        for count in worker_counts:
+            with serve({}, args=("--host", "127.0.0.1", "--workers", str(count)),
+                       command=("app.serve",)) as base_url:
+                if warmup:
+                    pool.starmap(drive, [(base_url, users, {"get": 1}, warmup, threads, i) for i in range(clients)])
+                results = pool.starmap(drive, [(base_url, users, mix, duration, threads, i)
+                                               for i in range(clients)])
+            rps = sum(done for done, _ in results) / duration
+            errors = sum(failed for _, failed in results)
+            baseline = baseline or rps
+            speedup = rps / baseline
+            print(f"{count:>7} {rps:>9.1f} {errors:>7} {speedup:>7.2f}x {speedup / count:>10.0%}")
+
+
+if __name__ == "__main__":
+    cpus = default_workers()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=worker_steps(cpus),
+                        help="comma-separated worker counts, default: powers of two up to the CPU count")
+    parser.add_argument("--clients", type=int, default=max(2, cpus), help="load-generating processes")
+    parser.add_argument("--threads", type=int, default=4, help="connections per load process")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--mix", default="list=20,get=80")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    args = parser.parse_args()
+    run([int(count) for count in args.workers.split(",")], args.clients, args.threads, args.users,
+        parse_mix(args.mix), args.duration, args.warmup)
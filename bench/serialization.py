@@ -0,0 +1,72 @@
+"""Per-request CPU of a users list page: validated models vs rows dumped once.
+
+    python -m bench.serialization --sizes 50,1000
+
+``legacy`` is the previous path: ORM objects paginated into
+``Page[UserResponse]``, validated again against ``response_model`` and
+rendered by ``jsonable_encoder`` + ``json.dumps``. ``fast`` is the current
+one: ``Row`` mappings from ``get_users_page`` rendered once by
+``FastJSONResponse``. Both run in-process through the same ASGI stack.
+"""
+import argparse
+import time
+
+from fastapi import Depends, FastAPI, Query
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlmodel import paginate
+from sqlmodel import Session, select
+
+from app.database import users as user_crud
+from app.database.engine import create_db_and_tables, engine
+from app.models.User import User, UserResponse
+from app.responses import FastJSONResponse
+from bench.pagination import seed
+
+
+class BenchParams(Params):
+    size: int = Query(50, ge=1, le=1000)
+
+
+app = FastAPI()
+
+
+@app.get("/legacy", response_model=Page[UserResponse], response_class=JSONResponse)
+def legacy_page(params: BenchParams = Depends()):
+    with Session(engine) as session:
+        return paginate(session, select(User).order_by(User.id), params)
+
+
+@app.get("/fast", response_model=Page[UserResponse])
+def fast_page(params: BenchParams = Depends()):
+    return FastJSONResponse(user_crud.get_users_page(params))
+
+
+def cpu_ms(client: TestClient, path: str, size: int, repeat: int) -> float:
+    client.get(path, params={"size": size})
+    started = time.process_time()
+    for _ in range(repeat):
+        client.get(path, params={"size": size})
+    return (time.process_time() - started) / repeat * 1000
+
+
+def run(sizes, repeat: int) -> None:
+    create_db_and_tables()
+    seed(max(sizes))
+    with TestClient(app) as client:
+        assert client.get("/legacy", params={"size": 50}).json() == client.get("/fast", params={"size": 50}).json()
+        print(f"{'page size':>9} {'legacy ms':>10} {'fast ms':>8} {'saved':>7}")
+        for size in sizes:
+            rounds = max(5, repeat * 50 // size)
+            legacy = cpu_ms(client, "/legacy", size, rounds)
+            fast = cpu_ms(client, "/fast", size, rounds)
+            print(f"{size:>9} {legacy:>10.2f} {fast:>8.2f} {1 - fast / legacy:>6.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="50,1000")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(",")], args.repeat)
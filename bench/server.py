@@ -0,0 +1,39 @@
+"""Boot ``app.main:app`` in a subprocess for benchmarks."""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def serve(env: dict, port: int = None, args=(), command=("uvicorn", "app.main:app")):
+    port = port or free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", *command, "--port", str(port), "--log-level", "warning", *args],
+        env={**os.environ, **env},
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                requests.get(f"{base_url}/health", timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"Server on port {port} did not start")
+                time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
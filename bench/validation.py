@@ -0,0 +1,48 @@
+"""Client-side validation of a users page: voluptuous only vs the TypeAdapter fast path.
+
+    python -m bench.validation --sizes 10,1000,100000
+"""
+import argparse
+import time
+
+from voluptuous import Schema
+
+from app.api.users_client import USER_LIST_SCHEMA, USER_SCHEMA
+from app.tools.import_users import generate_users
+
+
+def page(size: int) -> dict:
+    users = [{"id": i, **user} for i, user in enumerate(generate_users(size), 1)]
+    return {"page": 1, "per_page": size, "total": size, "total_pages": 1, "data": users,
+            "support": {"url": "https://reqres.in", "text": "bench"}}
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(sizes, repeat: int) -> None:
+    started = time.perf_counter()
+    Schema(USER_LIST_SCHEMA.schema.schema)
+    compile_ms = (time.perf_counter() - started) * 1000
+    print(f"schema compile: {compile_ms:.3f} ms (paid once per process)")
+    print(f"{'items':>7} {'voluptuous ms':>14} {'fast path ms':>13} {'speedup':>8}")
+    for size in sizes:
+        payload = page(size)
+        rounds = max(1, repeat * 1000 // max(size, 1000))
+        slow = timed(lambda: USER_LIST_SCHEMA.schema(payload), rounds)
+        fast = timed(lambda: USER_LIST_SCHEMA(payload), rounds)
+        print(f"{size:>7} {slow:>14.3f} {fast:>13.3f} {slow / fast:>7.1f}x")
+    assert USER_LIST_SCHEMA(payload) == USER_LIST_SCHEMA.schema(payload)
+    assert USER_SCHEMA(payload["data"][0]) == payload["data"][0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,1000,100000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(",")], args.repeat)
@@ -2,6 +2,7 @@ class Server:
     def __init__(self, env):
         self.reqres = {
             "dev": "http://localhost:8002/",
+            "inprocess": "http://testserver",
             "beta": "",
             "rc": "",
         }[env]
\ No newline at end of file
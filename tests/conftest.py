@@ -1,30 +1,130 @@
-import pytest
+import io
+import itertools
 import os
+import shutil
+import tempfile
+
+import pytest
+import requests
 from dotenv import load_dotenv
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
 
 load_dotenv()
 
+IN_PROCESS_URL = "http://testserver"
+
 def pytest_addoption(parser):
     parser.addoption(
         "--env",
         default="dev",
-        help="Environment to run tests against: local or prod"
+        help="Environment to run tests against: dev, prod or inprocess"
     )
 
+def pytest_configure(config):
+    # Settings are read when app modules are imported, so the per-worker
+    # database has to be in the environment before collection starts.
+    if config.getoption("--env") != "inprocess":
+        return
+    worker = os.getenv("PYTEST_XDIST_WORKER", "main")
+    config.database_dir = tempfile.mkdtemp(prefix=f"users-{worker}-")
+    os.environ["DATABASE_ENGINE"] = f"sqlite:///{os.path.join(config.database_dir, 'users.db')}"
+    os.environ["DATABASE_ASYNC_ENGINE"] = ""
+    os.environ["DATABASE_REPLICAS"] = ""
+
+def pytest_unconfigure(config):
+    database_dir = getattr(config, "database_dir", None)
+    if database_dir:
+        shutil.rmtree(database_dir, ignore_errors=True)
+
+class ASGIAdapter(BaseAdapter):
+    """Transport adapter that hands ``requests`` calls to the app in-process."""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body.encode() if isinstance(request.body, str) else request.body
+        response = self.client.request(request.method, request.url, content=body, headers=dict(request.headers))
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.reason = response.reason_phrase
+        result.headers = CaseInsensitiveDict(response.headers)
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.raw = io.BytesIO(response.content)
+        result.url = request.url
+        result.request = request
+        return result
+
+    def close(self):
+        pass
+
 @pytest.fixture(scope="session")
 def env(request):
     return request.config.getoption("--env")
 
+@pytest.fixture(scope="session")
+def asgi_app():
+    """Приложение в текущем процессе: без сокетов, со своей БД на каждый воркер."""
+    from fastapi.testclient import TestClient
+    from app.database.engine import create_db_and_tables
+    from app.main import app
+
+    create_db_and_tables()
+    with TestClient(app, base_url=IN_PROCESS_URL) as client, pytest.MonkeyPatch.context() as patch:
+        adapter = ASGIAdapter(client)
+        get_adapter = requests.Session.get_adapter
+        patch.setattr(requests.Session, "get_adapter",
+                      lambda session, url: adapter if url.startswith(IN_PROCESS_URL) else get_adapter(session, url))
+        yield app
+
+@pytest.fixture(scope="session", autouse=True)
+def in_process_app(env, request):
+    if env == "inprocess":
+        request.getfixturevalue("asgi_app")
+
 @pytest.fixture(scope="session")
 def app_url(env):
     if env == "dev":
         return os.getenv("APP_URL", "http://127.0.0.1:8002")
     elif env == "prod":
         return os.getenv("APP_URL_PROD", "https://your-production-url.com")
+    elif env == "inprocess":
+        return IN_PROCESS_URL
     else:
         raise ValueError(f"Unknown environment: {env}")
 
 @pytest.fixture(scope="session")
 def api_client(app_url):
     from app.api.users_client import UserApiClient
-    return UserApiClient(base_url=app_url)
\ No newline at end of file
+    return UserApiClient(base_url=app_url)
+
+@pytest.fixture
+def use_crud_engine(monkeypatch):
+    """Направляет CRUD-функции на заданный движок и реплики (по умолчанию без реплик)"""
+    from app.database import engine as engine_module, users as user_crud
+
+    def use(engine, replicas=()):
+        monkeypatch.setattr(user_crud, "engine", engine)
+        monkeypatch.setattr(engine_module, "replica_engines", list(replicas))
+        monkeypatch.setattr(engine_module, "_replicas", itertools.cycle(replicas))
+        return engine
+
+    return use
+
+@pytest.fixture
+def crud_db(request, tmp_path, use_crud_engine):
+    """Отдельная база для CRUD: SQLite во временном каталоге или URL из параметра (indirect)"""
+    from sqlmodel import SQLModel, create_engine
+
+    url = getattr(request, "param", None)
+    engine = create_engine(url or f"sqlite:///{tmp_path / 'users.db'}")
+    if url:
+        SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield use_crud_engine(engine)
+    if url:
+        SQLModel.metadata.drop_all(engine)
+    engine.dispose()
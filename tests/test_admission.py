@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.admission import READ, WRITE, AdmissionController, AdmissionRoute, Overloaded
+
+
+def test_queue_is_bounded_and_writes_go_first():
+    """Тест ограничения очереди и приоритета записей над чтениями"""
+    async def scenario():
+        controller = AdmissionController(limit=1, queue_size=2, timeout=5)
+        await controller.acquire(READ)
+        order = []
+
+        async def wait(priority, name):
+            try:
+                await controller.acquire(priority)
+            except Overloaded as e:
+                order.append((name, e.reason))
+                return
+            order.append((name, "admitted"))
+            controller.release()
+
+        first_read = asyncio.create_task(wait(READ, "read1"))
+        second_read = asyncio.create_task(wait(READ, "read2"))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await controller.acquire(READ)
+        write = asyncio.create_task(wait(WRITE, "write"))
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(first_read, second_read, write)
+        return order, controller.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == [("read2", "evicted"), ("write", "admitted"), ("read1", "admitted")]
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_waiter_gives_up_after_deadline():
+    """Тест таймаута ожидания в очереди"""
+    async def scenario():
+        controller = AdmissionController(limit=1, queue_size=5, timeout=0.01)
+        await controller.acquire()
+        with pytest.raises(Overloaded) as error:
+            await controller.acquire()
+        controller.release()
+        return error.value.reason, controller.stats()
+
+    reason, stats = asyncio.run(scenario())
+    assert reason == "timeout"
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_route_sheds_with_retry_after_and_holds_slot_while_streaming():
+    """Тест ответа 503 с Retry-After и освобождения слота после отдачи потока"""
+    controller = AdmissionController(limit=1, queue_size=0)
+
+    class LimitedRoute(AdmissionRoute):
+        pass
+
+    LimitedRoute.controller = controller
+    router = APIRouter(route_class=LimitedRoute)
+    seen = []
+
+    @router.get("/stream")
+    def stream():
+        def body():
+            seen.append(controller.active)
+            yield "chunk"
+        return StreamingResponse(body())
+
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        assert client.get("/stream").text == "chunk"
+        assert seen == [1], "Slot was released before the body was sent"
+        assert controller.active == 0
+
+        controller.active = 1
+        response = client.get("/stream")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"].isdigit()
+        controller.active = 0
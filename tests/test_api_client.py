@@ -0,0 +1,124 @@
+from datetime import datetime
+import time
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.api.client import send_with_retry
+from app.api.users_client import UserApiClient
+
+
+class FlakyAdapter(HTTPAdapter):
+    """Адаптер, отвечающий 503 заданное число раз, затем 200"""
+
+    def __init__(self, failures: int, headers=None):
+        super().__init__()
+        self.failures = failures
+        self.headers = headers or {}
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 503 if self.calls <= self.failures else 200
+        if response.status_code == 503:
+            response.headers.update(self.headers)
+        response.request = request
+        response.url = request.url
+        return response
+
+
+@pytest.fixture
+def flaky_session():
+    session = requests.Session()
+    adapter = FlakyAdapter(failures=2)
+    session.mount("http://", adapter)
+    return session, adapter
+
+
+def test_idempotent_request_is_retried(flaky_session):
+    """Тест повтора идемпотентного запроса с учетом таймингов"""
+    session, adapter = flaky_session
+    timings = []
+    response = send_with_retry(session, "GET", "http://flaky/api/users/1", retries=3, backoff=0.001,
+                               on_timing=lambda *args: timings.append(args))
+    assert response.status_code == 200
+    assert adapter.calls == 3
+    assert [(status, attempt) for _, _, status, _, attempt in timings] == [(503, 0), (503, 1), (200, 2)]
+
+
+@pytest.mark.parametrize("retry_after, waits", [
+    ("2", [2.0, 2.0]),
+    ("Wed, 21 Oct 2015 07:28:00 GMT", [0.0, 0.0]),
+    ("120", []),
+])
+def test_retry_after_is_honored(monkeypatch, retry_after, waits):
+    """Тест: задержка между повторами берется из Retry-After, слишком долгое ожидание не выполняется"""
+    session = requests.Session()
+    adapter = FlakyAdapter(failures=2, headers={"Retry-After": retry_after})
+    session.mount("http://", adapter)
+    sleeps = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    response = send_with_retry(session, "GET", "http://flaky/api/users/1", retries=3, backoff=10)
+    assert sleeps == waits
+    assert response.status_code == (503 if not waits else 200)
+
+
+def test_non_idempotent_request_is_not_retried(flaky_session):
+    """Тест: POST не повторяется"""
+    session, adapter = flaky_session
+    response = send_with_retry(session, "POST", "http://flaky/api/users/", retries=3, backoff=0.001)
+    assert response.status_code == 503
+    assert adapter.calls == 1
+
+
+def test_concurrent_fan_out(app_url):
+    """Тест параллельных операций над набором пользователей"""
+    timings = []
+    client = UserApiClient(app_url, pool_size=4, max_workers=4, on_timing=lambda *args: timings.append(args))
+    stamp = datetime.now().timestamp()
+    users = client.create_users_concurrently([
+        {"email": f"fanout_{stamp}_{i}@example.com", "first_name": "Fan", "last_name": str(i)} for i in range(8)
+    ])
+    ids = [user["id"] for user in users]
+    assert [user["last_name"] for user in users] == [str(i) for i in range(8)]
+
+    updated = client.update_users_concurrently({user_id: {"first_name": "Out"} for user_id in ids})
+    assert {user["first_name"] for user in updated} == {"Out"}
+    assert [user["id"] for user in client.get_users_concurrently(ids)] == ids
+    assert client.delete_users_concurrently(ids) == [204] * 8
+    assert len(timings) == 32
+
+
+def test_subscribe_changes(app_url):
+    """Тест ленты изменений: создание, изменение и удаление приходят подписчику по порядку"""
+    client = UserApiClient(app_url)
+    head = int(requests.get(f"{app_url}/api/users/changes", params={"idle_timeout": 0}).headers["X-Last-Event-ID"])
+    user = client.create_user({"email": f"changes_{datetime.now().timestamp()}@example.com",
+                               "first_name": "Change", "last_name": "Feed"})
+    client.update_user(user["id"], {"first_name": "Changed"})
+    client.delete_user(user["id"])
+
+    events = [event for event in client.subscribe_changes(head, idle_timeout=0.2)
+              if event.get("user_id") == user["id"]]
+    assert [event["type"] for event in events] == ["created", "updated", "deleted"]
+    assert events[1]["user"]["first_name"] == "Changed"
+    assert events[2]["user"] is None
+
+
+def test_conditional_get_cache(app_url):
+    """Тест клиентского кэша условных GET и If-Match из закэшированного ETag"""
+    client = UserApiClient(app_url)
+    user = client.create_user({"email": f"etag_client_{datetime.now().timestamp()}@example.com",
+                               "first_name": "Etag", "last_name": "Client"})
+    assert client.get_user(user["id"]) == client.get_user(user["id"]) == user
+    assert client.not_modified == 1
+
+    etag = client.cached_etag(user["id"])
+    assert client.update_user(user["id"], {"last_name": "Updated"}, if_match=etag)["last_name"] == "Updated"
+    assert client.get_user(user["id"])["last_name"] == "Updated"
+    assert client.not_modified == 2, "PATCH response was not cached"
+    with pytest.raises(requests.HTTPError) as error:
+        client.delete_user(user["id"], if_match=etag)
+    assert error.value.response.status_code == 412
+    assert client.delete_user(user["id"], if_match=client.cached_etag(user["id"])) == 204
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine as async_engine_module, async_users
+from app.models.User import UserCreate, UserUpdate
+
+
+@pytest.fixture
+def async_db(tmp_path, monkeypatch):
+    """Фикстура с отдельной базой SQLite для асинхронного CRUD (aiosqlite)"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+    asyncio.run(create_tables())
+    monkeypatch.setattr(async_engine_module, "async_replica_engines", [])
+    monkeypatch.setattr(async_users, "async_session",
+                        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    yield
+    asyncio.run(engine.dispose())
+
+
+def test_async_crud_lifecycle(async_db):
+    """Полный цикл асинхронных CRUD операций"""
+    async def scenario():
+        created = await async_users.create_user(UserCreate(
+            email="async@example.com", first_name="Async", last_name="User"))
+        fetched = await async_users.get_user(created.id)
+        assert fetched.email == "async@example.com"
+
+        updated = await async_users.update_user(created.id, UserUpdate(first_name="Updated"))
+        assert updated.first_name == "Updated"
+        assert updated.last_name == "User"
+
+        assert await async_users.delete_user(created.id)
+        assert await async_users.get_user(created.id) is None
+        assert not await async_users.delete_user(created.id)
+
+    asyncio.run(scenario())
+
+
+def test_async_concurrent_creates(async_db):
+    """Тест параллельного создания пользователей через асинхронный CRUD"""
+    async def scenario():
+        created = await asyncio.gather(*(
+            async_users.create_user(UserCreate(email=f"user{i}@example.com", first_name="Async", last_name=str(i)))
+            for i in range(20)
+        ))
+        users = await async_users.get_users_after(None, 100)
+        assert sorted(user.id for user in users) == sorted(user.id for user in created)
+
+    asyncio.run(scenario())
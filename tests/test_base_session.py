@@ -0,0 +1,47 @@
+import logging
+from datetime import datetime
+
+import pytest
+
+import base_session
+from base_session import BaseSession
+
+
+@pytest.fixture
+def no_curl(monkeypatch):
+    """Фикстура, запрещающая рендер curl"""
+    def fail(request):
+        raise AssertionError("curl rendered while logging is disabled")
+    monkeypatch.setattr(base_session.curlify, "to_curl", fail)
+
+
+def test_returns_response_without_rendering_curl(app_url, no_curl, caplog):
+    """Запрос возвращает ответ и не строит curl при выключенном логировании."""
+    caplog.set_level(logging.WARNING, logger=base_session.logger.name)
+    response = BaseSession(base_url=app_url).get("/health")
+    assert response.status_code == 200
+
+
+def test_logs_curl_when_enabled(app_url, caplog):
+    """При включенном INFO логируется curl с кодом ответа."""
+    with caplog.at_level(logging.INFO, logger=base_session.logger.name):
+        BaseSession(base_url=app_url).get("/health")
+    assert any(record.getMessage().startswith("curl ") and record.getMessage().endswith("-> 200")
+               for record in caplog.records)
+
+
+def test_timing_hook_and_sampling(app_url, no_curl, caplog):
+    """Хук получает фазы запроса и размеры; sample_rate=0 отключает хук."""
+    caplog.set_level(logging.WARNING, logger=base_session.logger.name)
+    timings = []
+    session = BaseSession(base_url=app_url, on_timing=timings.append)
+    response = session.post("/api/users/", json={"email": f"timing_{datetime.now().timestamp()}@example.com", "first_name": "Timing",
+                                                  "last_name": "Hook"})
+    timing, = timings
+    assert (timing.method, timing.status_code) == ("POST", 201)
+    assert 0 <= timing.dns + timing.connect <= timing.ttfb <= timing.total
+    assert timing.request_bytes == len(response.request.body)
+    assert timing.response_bytes == len(response.content)
+
+    BaseSession(base_url=app_url, on_timing=timings.append, sample_rate=0).get("/health")
+    assert len(timings) == 1
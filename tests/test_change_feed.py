@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.users_client import _parse_events
+from app.database import changes
+from app.database.changes import CREATED, DELETED, UPDATED, ChangeBus, PostgresChangeBus
+from app.routers import changes as changes_router
+
+
+def test_resume_replays_buffer_and_reports_gap():
+    """Тест возобновления по Last-Event-ID из кольцевого буфера и сигнала о пропуске"""
+    async def scenario():
+        bus = ChangeBus(buffer_size=3)
+        for user_id in range(1, 6):
+            bus.publish(CREATED, user_id, {"id": user_id})
+        resumed, stale, live = bus.subscribe(3), bus.subscribe(1), bus.subscribe()
+        return bus, resumed, stale, live
+
+    bus, resumed, stale, live = asyncio.run(scenario())
+    assert [event.id for event in resumed.replay] == [4, 5] and not resumed.gap
+    assert [event.id for event in stale.replay] == [3, 4, 5] and stale.gap
+    assert live.replay == [] and live.head == 5
+    assert bus.stats()["subscribers"] == 3
+
+
+def test_slow_subscriber_overflows_without_blocking_publishers():
+    """Тест обратного давления: медленный подписчик помечается переполненным, публикация не блокируется"""
+    async def scenario():
+        bus = ChangeBus(queue_size=2)
+        slow, fast = bus.subscribe(), bus.subscribe()
+        received = []
+
+        async def drain():
+            while len(received) < 3:
+                received.append((await fast.get(1)).type)
+
+        consumer = asyncio.create_task(drain())
+        for change_type in (CREATED, UPDATED):
+            bus.publish(change_type, 1)
+            await asyncio.sleep(0)
+        # Публикация из потока, как из синхронных CRUD-функций в пуле потоков
+        publisher = threading.Thread(target=bus.publish, args=(DELETED, 1))
+        publisher.start()
+        publisher.join()
+        await asyncio.wait_for(consumer, 1)
+        return slow, received
+
+    slow, received = asyncio.run(scenario())
+    assert received == [CREATED, UPDATED, DELETED]
+    assert slow.overflowed and slow.queue.qsize() == 2
+
+
+def test_sse_endpoint_streams_events(monkeypatch):
+    """Тест SSE-эндпоинта: формат событий, reset при устаревшем id и закрытие по простою"""
+    bus = ChangeBus(buffer_size=2)
+    monkeypatch.setattr(changes, "change_bus", bus)
+    for user_id in range(1, 4):
+        bus.publish(UPDATED, user_id, {"id": user_id})
+    app = FastAPI()
+    app.include_router(changes_router.router)
+
+    with TestClient(app) as client:
+        response = client.get("/api/users/changes", headers={"Last-Event-ID": "2"}, params={"idle_timeout": 0.05})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.headers["X-Last-Event-ID"] == "3"
+        assert "id: 3\nevent: updated\n" in response.text
+        assert list(_parse_events(response.text.splitlines())) == [
+            ("updated", {"id": 3, "type": "updated", "user_id": 3, "user": {"id": 3}})]
+
+        response = client.get("/api/users/changes", params={"since": 0, "idle_timeout": 0.05})
+        assert [name for name, _ in _parse_events(response.text.splitlines())] == ["reset", "updated", "updated"]
+    assert bus.stats()["subscribers"] == 0
+
+
+def test_unsent_response_leaves_no_subscription(monkeypatch):
+    """Тест: ответ, тело которого так и не начали отправлять, не оставляет подписки"""
+    bus = ChangeBus()
+    monkeypatch.setattr(changes, "change_bus", bus)
+    bus.publish(CREATED, 1)
+
+    async def scenario():
+        response = await changes_router.user_changes(last_event_id=None, since=None, idle_timeout=None)
+        return response, bus.stats()["subscribers"]
+
+    response, subscribers = asyncio.run(scenario())
+    assert subscribers == 0
+    assert response.headers["X-Last-Event-ID"] == "1"
+
+
+def test_postgres_listener_reconnects_with_backoff(monkeypatch, caplog):
+    """Тест переподключения слушателя PostgreSQL: растущая пауза, лог и сброс буфера"""
+    class Stop(BaseException):
+        pass
+
+    attempts, delays = [], []
+
+    def receive():
+        attempts.append(1)
+        if len(attempts) == 4:
+            raise Stop
+        raise ConnectionError("connection lost")
+
+    async def scenario():
+        bus = PostgresChangeBus(engine=None, reconnect_delay=0.5, max_reconnect_delay=1.5)
+        subscription = ChangeBus.subscribe(bus)
+        with bus._lock:
+            bus._dispatch(changes.ChangeEvent(7, CREATED, 1, None))
+        monkeypatch.setattr(bus, "_receive", receive)
+        monkeypatch.setattr(changes.time, "sleep", delays.append)
+        try:
+            bus._listen()
+        except Stop:
+            pass
+        await asyncio.sleep(0)
+        return bus, subscription
+
+    with caplog.at_level(logging.ERROR, logger="app.database.changes"):
+        bus, subscription = asyncio.run(scenario())
+    assert delays == [0.5, 1.0, 1.5]
+    assert bus.last_id == 0 and subscription.overflowed
+    assert sum("reconnecting" in record.getMessage() for record in caplog.records) == 3
+
+
+def test_postgres_publish_is_best_effort(monkeypatch, caplog):
+    """Тест: ошибка NOTIFY логируется, не роняет запись и не ждет слушателя"""
+    class DownEngine:
+        def begin(self):
+            raise ConnectionError("database is down")
+
+    stop = threading.Event()
+    bus = PostgresChangeBus(DownEngine(), poll_interval=5)
+    monkeypatch.setattr(bus, "_listen", stop.wait)  # слушатель так и не подключается
+
+    started = time.monotonic()
+    with caplog.at_level(logging.ERROR, logger="app.database.changes"):
+        bus.publish(CREATED, 1, {"id": 1})
+    stop.set()
+    assert time.monotonic() - started < 1
+    assert any("Could not publish 1 user change" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import create_engine
+
+from app.database import users as user_crud
+from app.database.engine import add_autoincrement, create_columns, create_indexes
+from app.models.User import UserCreate, UserUpdate
+
+
+@pytest.fixture
+def statements(crud_db):
+    """Фикстура со списком SQL запросов, выполненных в отдельной базе"""
+    executed = []
+    event.listen(crud_db, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "fallback"])
+def returning(request, statements, monkeypatch):
+    """Фикстура, переключающая поддержку RETURNING в диалекте"""
+    dialect = user_crud.engine.dialect
+    for flag in ("insert_returning", "update_returning", "delete_returning"):
+        monkeypatch.setattr(dialect, flag, request.param and getattr(dialect, flag))
+    return request.param
+
+
+def test_write_round_trips(statements, returning):
+    """Тест количества SQL запросов на создание, изменение и удаление"""
+    user = user_crud.create_user(UserCreate(email="one@example.com", first_name="One", last_name="User"))
+    assert len(statements) == 1
+    assert user.email == "one@example.com"
+
+    statements.clear()
+    updated = user_crud.update_user(user.id, UserUpdate(last_name="Updated"))
+    assert len(statements) == (1 if returning else 2)
+    assert updated.last_name == "Updated"
+    assert updated.first_name == "One"
+
+    statements.clear()
+    assert user_crud.delete_user(user.id)
+    assert len(statements) == 1
+
+    assert user_crud.update_user(user.id, UserUpdate(last_name="Ghost")) is None
+    assert not user_crud.delete_user(user.id)
+
+
+def test_update_clears_explicit_null(statements, returning):
+    """Тест PATCH: явный null сбрасывает поле, неуказанные поля не меняются"""
+    user = user_crud.create_user(UserCreate(email="two@example.com", first_name="Two", last_name="User",
+                                            avatar="http://example.com/avatar.png"))
+    updated = user_crud.update_user(user.id, UserUpdate(avatar=None))
+    assert updated.avatar is None
+    assert updated.first_name == "Two"
+
+
+def test_versioned_writes_in_one_statement(statements, returning):
+    """Тест версий: каждая запись увеличивает version, условная запись по версии - один запрос"""
+    user = user_crud.create_user(UserCreate(email="three@example.com", first_name="Three", last_name="User"))
+    assert user.version == 1
+
+    statements.clear()
+    updated = user_crud.update_user(user.id, UserUpdate(last_name="Updated"), versions={1})
+    assert len(statements) == (1 if returning else 2)
+    assert updated.version == 2
+    with pytest.raises(user_crud.VersionMismatch):
+        user_crud.update_user(user.id, UserUpdate(last_name="Stale"), versions={1})
+    with pytest.raises(user_crud.VersionMismatch):
+        user_crud.delete_user(user.id, versions={1})
+
+    statements.clear()
+    assert user_crud.delete_user(user.id, versions={2})
+    assert len(statements) == 1
+
+
+def test_version_column_added_to_existing_table(tmp_path):
+    """Тест добавления колонки version в таблицу, созданную до ее появления"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE "user" (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, '
+                          'first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, avatar VARCHAR)'))
+        conn.execute(text("""INSERT INTO "user" (email, first_name, last_name) VALUES ('old@example.com', 'Old', 'U')"""))
+        create_columns(conn)
+        create_columns(conn)
+        assert conn.execute(text('SELECT version FROM "user"')).scalar_one() == 1
+    engine.dispose()
+
+
+def test_existing_table_rebuilt_with_autoincrement(tmp_path):
+    """Тест: старая таблица без AUTOINCREMENT перестраивается, id удаленного пользователя не переиспользуется"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE "user" (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, '
+                          'first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, avatar VARCHAR)'))
+        conn.execute(text("""INSERT INTO "user" (email, first_name, last_name) VALUES ('a@example.com', 'A', 'U'), """
+                          """('b@example.com', 'B', 'U')"""))
+        create_columns(conn)
+        add_autoincrement(conn)
+        add_autoincrement(conn)
+        create_indexes(conn)
+        conn.execute(text('DELETE FROM "user" WHERE id = 2'))
+        conn.execute(text("""INSERT INTO "user" (email, first_name, last_name) VALUES ('c@example.com', 'C', 'U')"""))
+        rows = conn.execute(text('SELECT id, email, version FROM "user" ORDER BY id')).all()
+        indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert [tuple(row) for row in rows] == [(1, "a@example.com", 1), (3, "c@example.com", 1)]
+    assert "ix_user_email" in indexes
+    engine.dispose()
+
+
+def test_duplicate_emails_block_unique_index(tmp_path):
+    """Тест: повторяющиеся email в старой таблице дают понятную ошибку вместо IntegrityError"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE "user" (id INTEGER PRIMARY KEY AUTOINCREMENT, email VARCHAR NOT NULL, '
+                          'first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL, avatar VARCHAR)'))
+        conn.execute(text("""INSERT INTO "user" (email, first_name, last_name) VALUES ('a@example.com', 'A', 'U'), """
+                          """('a@example.com', 'B', 'U')"""))
+        create_columns(conn)
+        with pytest.raises(RuntimeError, match="ix_user_email.*'a@example.com'"):
+            create_indexes(conn)
+    engine.dispose()
@@ -0,0 +1,48 @@
+import os
+import pytest
+from sqlalchemy import insert
+from sqlmodel import SQLModel, create_engine
+
+from app.database import users as user_crud
+from app.models.User import User
+from app.routers.users import export_stream
+
+EXPORT_ROWS = int(os.getenv("EXPORT_TEST_ROWS", 1_000_000))
+MEMORY_CEILING = 64 * 1024 * 1024
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.fixture(scope="module")
+def synthetic_db(tmp_path_factory):
+    """База SQLite с синтетическими пользователями для выгрузки"""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('export') / 'users.db'}")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for start in range(0, EXPORT_ROWS, 50_000):
+            conn.execute(insert(User), [
+                {"email": f"user{i}@example.com", "first_name": "Export", "last_name": f"User{i}",
+                 "avatar": f"https://example.com/avatars/{i}.png"}
+                for i in range(start, min(start + 50_000, EXPORT_ROWS))
+            ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="RSS is read from /proc")
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_export_memory_is_constant(synthetic_db, use_crud_engine, export_format):
+    """Тест: выгрузка всей таблицы укладывается в фиксированный лимит памяти"""
+    use_crud_engine(synthetic_db)
+
+    baseline = peak = rss()
+    lines = 0
+    for chunk in export_stream(user_crud.iter_user_batches(), export_format):
+        lines += chunk.count("\n")
+        peak = max(peak, rss())
+
+    assert lines == EXPORT_ROWS + (1 if export_format == "csv" else 0)
+    assert peak - baseline < MEMORY_CEILING, f"Export grew RSS by {peak - baseline} bytes"
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import pytest
+from sqlmodel import select, Session
+
+from app.database import users as user_crud
+from app.models.User import User, UserCreate
+from app.tools import import_users as importer
+
+USERS_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "users.json")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_json_array_streaming_matches_json_load(chunk_size):
+    """Тест потокового чтения JSON массива порциями разного размера"""
+    with open(USERS_JSON, encoding="utf-8") as f:
+        expected = json.load(f)
+    with open(USERS_JSON, encoding="utf-8") as f:
+        assert list(importer.iter_json_array(f, chunk_size=chunk_size)) == expected
+    assert list(importer.iter_json_array(io.StringIO("[12345, 678]"), chunk_size=3)) == [12345, 678]
+
+
+@pytest.mark.parametrize("export_format", ["json", "ndjson", "csv"])
+def test_generated_users_round_trip(export_format):
+    """Тест генерации синтетических пользователей во всех форматах"""
+    generated = list(importer.generate_users(25))
+    stream = io.StringIO()
+    assert importer.write_users(generated, stream, export_format) == 25
+    stream.seek(0)
+    assert list(importer.READERS[export_format](stream)) == generated
+
+
+def test_import_reports_rejected_records(crud_db):
+    """Тест импорта с отчетом об отклоненных записях"""
+    records = list(importer.generate_users(10))
+    records[3]["email"] = "invalid-email"
+    rejected_out = io.StringIO()
+
+    progress = importer.Progress(io.StringIO())
+    imported, rejected = importer.import_users(records, batch_size=4, rejected_out=rejected_out, progress=progress)
+    assert (imported, rejected) == (9, 1)
+    assert json.loads(rejected_out.getvalue())["index"] == 3
+    assert "rows/s" in progress.out.getvalue()
+
+    with Session(crud_db) as session:
+        emails = session.exec(select(User.email).order_by(User.id)).all()
+    assert emails == [record["email"] for i, record in enumerate(records) if i != 3]
+
+
+def test_import_rejects_duplicate_emails(crud_db):
+    """Тест: дубликаты email отклоняются построчно, остальные записи пакета импортируются"""
+    records = list(importer.generate_users(6))
+    user_crud.create_users([UserCreate.model_validate(records[1])])
+    records[4]["email"] = records[3]["email"]
+    rejected_out = io.StringIO()
+
+    progress = importer.Progress(io.StringIO())
+    imported, rejected = importer.import_users(records, batch_size=3, rejected_out=rejected_out, progress=progress)
+    assert (imported, rejected) == (4, 2)
+    rejections = [json.loads(line) for line in rejected_out.getvalue().splitlines()]
+    assert [rejection["index"] for rejection in rejections] == [1, 4]
+    assert rejections[1]["record"]["email"] == records[3]["email"]
+    assert rejections[0]["errors"][0]["type"] == "integrity_error"
+
+    with Session(crud_db) as session:
+        assert len(session.exec(select(User.email)).all()) == 5
@@ -0,0 +1,88 @@
+import threading
+import pytest
+import requests
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import engine as engine_module
+from app.metrics import Counter, Histogram, db_query_latency, instrument_engine
+from app.routers import status
+
+
+def test_histogram_merges_thread_shards():
+    """Тест: наблюдения из разных потоков суммируются при выгрузке"""
+    histogram = Histogram("test_latency_seconds", "Test histogram.", buckets=(0.1, 1.0))
+
+    def observe():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, route="/x")
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    text = histogram.render()
+    assert 'test_latency_seconds_bucket{route="/x",le="0.1"} 4' in text
+    assert 'test_latency_seconds_bucket{route="/x",le="1.0"} 8' in text
+    assert 'test_latency_seconds_bucket{route="/x",le="+Inf"} 12' in text
+    assert 'test_latency_seconds_count{route="/x"} 12' in text
+
+
+def test_counter_labels():
+    """Тест счетчика с метками"""
+    counter = Counter("test_total", "Test counter.")
+    counter.inc(route="/a")
+    counter.inc(2, route="/b")
+    assert counter.samples() == [("test_total", (("route", "/a"),), 1), ("test_total", (("route", "/b"),), 2)]
+
+
+def test_failed_statement_leaves_no_timing_state():
+    """Тест: упавший запрос не оставляет время старта на соединении"""
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "failing")
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert not any(key.startswith("metrics") for key in conn.info)
+    counts = {labels: value for name, labels, value in db_query_latency.samples() if name.endswith("_count")}
+    assert counts[(("engine", "failing"),)] == 1
+    engine.dispose()
+
+
+def test_metrics_endpoint(app_url):
+    """Тест эндпоинта /metrics после запросов к API"""
+    requests.get(f"{app_url}/api/users/99999")
+    response = requests.get(f"{app_url}/metrics")
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/api/users/{user_id}",status="404"}' in response.text
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert "db_query_duration_seconds_count" in response.text
+    assert "db_pool_checked_out" in response.text
+
+
+def test_status_reports_database(app_url):
+    """Тест /status при доступной базе данных"""
+    response = requests.get(f"{app_url}/status")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_status_when_database_is_down(tmp_path, monkeypatch):
+    """Тест: /status отвечает 503 при недоступной базе, а /metrics продолжает работать и учитывает этот ответ"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing' / 'users.db'}")
+    monkeypatch.setattr(engine_module, "engine", engine)
+    app = FastAPI()
+    app.include_router(status.router)
+    with TestClient(app) as client:
+        response = client.get("/status")
+        assert response.status_code == 503
+        assert response.json() == {"detail": "Database unavailable"}
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/status",status="503"}' in response.text
+    engine.dispose()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import profiling
+from app.models.User import User
+from app.profiling import ProfilingMiddleware, profile_engine, statement_shape
+from app.settings import ProfilingSettings
+
+
+def test_statement_shape_collapses_in_lists():
+    """Тест нормализации запросов: списки IN разной длины дают одну форму"""
+    assert statement_shape("SELECT * FROM user\nWHERE id IN (?, ?, ?)") == "SELECT * FROM user WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM user WHERE id IN ($1, $2)") == statement_shape(
+        "SELECT * FROM user WHERE id IN ($1)")
+
+
+def test_disabled_profiling_installs_no_hooks(tmp_path):
+    """Тест отсутствия накладных расходов: без PROFILING_ENABLED хуки не ставятся"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    profile_engine(engine)
+    assert not engine.dispatch.before_cursor_execute
+    assert not engine.dispatch.after_cursor_execute
+
+
+def test_middleware_reports_queries(tmp_path, monkeypatch, caplog):
+    """Тест заголовка Server-Timing, лога медленных запросов и предупреждения об N+1"""
+    settings = ProfilingSettings(enabled=True, slow_ms=0, repeated_statements=2)
+    monkeypatch.setattr(profiling, "profiling_settings", settings)
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    SQLModel.metadata.create_all(engine)
+    profile_engine(engine)
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, settings=settings)
+
+    @app.get("/users")
+    def users():
+        with Session(engine) as session:
+            for user_id in range(3):
+                session.exec(select(User).where(User.id == user_id)).all()
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger="app.profiling"), TestClient(app) as client:
+        response = client.get("/users")
+
+    timing = response.headers["Server-Timing"]
+    assert 'desc="3 queries"' in timing and "app;dur=" in timing
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith("Slow request GET /users") for message in messages)
+    assert any("Possible N+1 in GET /users: statement ran 3 times" in message for message in messages)
+
+
+def test_cprofile_samples_one_request_at_a_time(tmp_path, monkeypatch):
+    """Тест: параллельные запросы не запускают второй cProfile, пока идет выборка"""
+    settings = ProfilingSettings(enabled=True, cprofile_route="GET /slow", cprofile_sample_rate=1,
+                                 cprofile_dir=str(tmp_path))
+    monkeypatch.setattr(profiling, "profiling_settings", settings)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, settings=settings)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            concurrent = await asyncio.gather(*(client.get("/slow") for _ in range(3)))
+            dumped = len(list(tmp_path.glob("*.prof")))
+            await client.get("/slow")
+        return [response.status_code for response in concurrent], dumped
+
+    statuses, dumped = asyncio.run(scenario())
+    assert statuses == [200] * 3
+    assert dumped == 1
+    assert len(list(tmp_path.glob("*.prof"))) == 2
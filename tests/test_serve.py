@@ -0,0 +1,51 @@
+import logging
+import os
+
+import pytest
+
+from app import serve
+from app.database import engine as engine_module
+from app.serve import pick
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_worker_gets_fresh_pool():
+    """Тест на то, что форкнутый воркер не наследует соединения из пула родителя."""
+    engine = engine_module.engine
+    with engine.connect():
+        pass
+    assert engine.pool.checkedin() >= 1
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, str(engine.pool.checkedin()).encode())
+        os._exit(0)
+    os.close(write_fd)
+    child_checked_in = int(os.read(read_fd, 16))
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    assert child_checked_in == 0, "Child process inherited pooled connections"
+    assert engine.pool.checkedin() >= 1, "Parent pool was disposed by the fork hook"
+
+
+def test_pick_falls_back_when_module_is_missing():
+    """Тест на выбор uvloop/httptools только при их наличии."""
+    assert pick("auto", "no_such_event_loop", "asyncio") == "asyncio"
+    assert pick("auto", "json", "asyncio") == "json"
+    assert pick("h11", "httptools", "h11") == "h11"
+
+
+def test_warns_about_per_process_backends(monkeypatch, caplog):
+    """Тест предупреждений о кеше и ленте изменений в памяти процесса при нескольких воркерах."""
+    monkeypatch.setattr(serve.cache_settings, "backend", "memory")
+    monkeypatch.setattr(serve, "create_db_and_tables", lambda: None)
+    runs = []
+    monkeypatch.setattr(serve.uvicorn, "run", lambda app, **options: runs.append(options["workers"]))
+
+    with caplog.at_level(logging.INFO, logger="app.serve"):
+        serve.main(["--workers", "2", "--loop", "asyncio", "--http", "h11"])
+    warnings = [record.getMessage() for record in caplog.records if record.levelno == logging.WARNING]
+    assert [message.split(" ", 1)[0] for message in warnings] == ["USER_CACHE=memory", "CHANGES_BACKEND=memory"]
+    assert runs == [2]
@@ -12,18 +12,13 @@ def fill_test_data(app_url):
     with open(users_json_path, encoding="utf-8") as f:
         test_data_users = json.load(f)
 
-    api_users = []
-    for user in test_data_users:
-        response = requests.post(f"{app_url}/api/users/", json=user)
-        assert response.status_code == 201, f"Failed to create user: {user}"
-        api_users.append(response.json())
-
-    user_ids = [user["id"] for user in api_users]
+    response = requests.post(f"{app_url}/api/users/bulk", json=test_data_users)
+    assert response.status_code == 201, f"Failed to create users: {response.text}"
+    user_ids = response.json()["ids"]
 
     yield user_ids
 
-    for user_id in user_ids:
-        requests.delete(f"{app_url}/api/users/{user_id}")
+    requests.delete(f"{app_url}/api/users/bulk", json=user_ids)
 
 def test_create_user(app_url):
     """Тест на создание пользователя (POST)."""
@@ -62,6 +57,14 @@ def test_patch_user(app_url, fill_test_data):
     assert response_get.status_code == 200, f"Get user failed after patch with status code {response_get.status_code}"
     assert response_get.json()["first_name"] == "UpdatedName", "User first name was not updated"
 
+def test_patch_user_with_nulls(app_url, fill_test_data):
+    """Тест на PATCH с null: поля не изменяются, ошибки нет."""
+    user_id = fill_test_data[1]
+    before = requests.get(f"{app_url}/api/users/{user_id}").json()
+    response = requests.patch(f"{app_url}/api/users/{user_id}", json={"first_name": None, "email": None})
+    assert response.status_code == 200, f"Patch with nulls failed with status code {response.status_code}"
+    assert response.json() == before, "Null fields changed the user"
+
 
 def test_get_user_after_update(app_url, fill_test_data):
     """Тест на получение пользователя (GET) после обновления."""
@@ -131,4 +134,151 @@ def test_delete_nonexistent_user(app_url):
 def test_method_not_allowed(app_url):
     """Тест на разрешение методов."""
     response = requests.put(f"{app_url}/api/users/")
-    assert response.status_code == 405, "405 not returned for disallowed method"
\ No newline at end of file
+    assert response.status_code == 405, "405 not returned for disallowed method"
+
+def test_list_users_offset_pages(app_url, fill_test_data):
+    """Тест на постраничное получение пользователей (page/size)."""
+    response = requests.get(f"{app_url}/api/users/", params={"page": 1, "size": 2})
+    assert response.status_code == 200, f"List users failed with status code {response.status_code}"
+    data = response.json()
+    assert len(data["items"]) == 2, "Page size is not respected"
+    assert data["total"] >= len(fill_test_data), "Total does not include test users"
+
+def test_list_users_cursor_pages(app_url, fill_test_data):
+    """Тест на получение пользователей по курсору (cursor/limit)."""
+    seen_ids = []
+    cursor = fill_test_data[0] - 1
+    while True:
+        response = requests.get(f"{app_url}/api/users/", params={"cursor": cursor, "limit": 3})
+        assert response.status_code == 200, f"List users failed with status code {response.status_code}"
+        data = response.json()
+        seen_ids.extend(user["id"] for user in data["data"])
+        if data["next_cursor"] is None:
+            break
+        cursor = data["next_cursor"]
+
+    assert seen_ids == sorted(seen_ids), "Cursor pages are not ordered by id"
+    assert len(seen_ids) == len(set(seen_ids)), "Cursor pages overlap"
+    assert set(fill_test_data[1:]) <= set(seen_ids), "Cursor pages skipped users"
+
+def test_bulk_create_skips_invalid_users(app_url):
+    """Тест на массовое создание пользователей с пропуском невалидных."""
+    payload = [
+        {"email": f"bulk_{datetime.now().microsecond}_{i}@example.com", "first_name": "Bulk", "last_name": str(i)}
+        for i in range(3)
+    ]
+    payload.insert(1, {"email": "invalid-email", "first_name": "Invalid", "last_name": "Email"})
+
+    response = requests.post(f"{app_url}/api/users/bulk", json=payload, params={"errors": "skip"})
+    assert response.status_code == 201, f"Bulk create failed with status code {response.status_code}"
+    data = response.json()
+    assert data["ids"][1] is None, "Invalid user was created"
+    assert [error["index"] for error in data["errors"]] == [1], "Invalid user was not reported"
+    created_ids = [user_id for user_id in data["ids"] if user_id is not None]
+    assert created_ids == sorted(created_ids), "Created ids are not in request order"
+
+    response = requests.delete(f"{app_url}/api/users/bulk", json=created_ids + [99999])
+    assert response.status_code == 200, f"Bulk delete failed with status code {response.status_code}"
+    assert sorted(response.json()["deleted"]) == created_ids, "Not all users were deleted"
+    assert response.json()["missing"] == [99999], "Missing user was not reported"
+
+def test_bulk_create_aborts_on_invalid_user(app_url):
+    """Тест на отказ массового создания при невалидном пользователе."""
+    payload = [
+        {"email": f"abort_{datetime.now().microsecond}@example.com", "first_name": "Bulk", "last_name": "User"},
+        {"email": "invalid-email", "first_name": "Invalid", "last_name": "Email"},
+    ]
+    response = requests.post(f"{app_url}/api/users/bulk", json=payload)
+    assert response.status_code == 422, "Validation error not returned for invalid bulk item"
+    assert response.json()["detail"][0]["index"] == 1, "Invalid item index was not reported"
+
+def test_filter_and_sort_users(app_url):
+    """Тест на фильтрацию, поиск по префиксу и сортировку списка пользователей."""
+    stamp = f"Filter{datetime.now().timestamp():.0f}{datetime.now().microsecond}"
+    payload = [
+        {"email": f"{stamp.lower()}_{i}@example.com", "first_name": first_name, "last_name": f"{stamp}{i}"}
+        for i, first_name in enumerate(["Charlie", "alice", "Bob"])
+    ]
+    response = requests.post(f"{app_url}/api/users/bulk", json=payload)
+    assert response.status_code == 201, f"Bulk create failed with status code {response.status_code}"
+    ids = response.json()["ids"]
+
+    response = requests.get(f"{app_url}/api/users/", params={"last_name": stamp.lower(), "sort": "first_name"})
+    assert response.status_code == 200, f"Filter failed with status code {response.status_code}"
+    assert [user["first_name"] for user in response.json()["items"]] == ["alice", "Bob", "Charlie"]
+
+    response = requests.get(f"{app_url}/api/users/", params={"email": payload[2]["email"]})
+    assert [user["id"] for user in response.json()["items"]] == [ids[2]], "Email lookup returned wrong users"
+
+    response = requests.get(f"{app_url}/api/users/", params={"last_name": stamp, "first_name": "A", "limit": 10})
+    assert [user["id"] for user in response.json()["data"]] == [ids[1]], "Cursor mode ignored the filters"
+
+    response = requests.get(f"{app_url}/api/users/", params={"sort": "avatar"})
+    assert response.status_code == 422, "Unknown sort key was accepted"
+
+    response = requests.post(f"{app_url}/api/users/", json=payload[0])
+    assert response.status_code == 409, "Duplicate email was accepted"
+
+    requests.delete(f"{app_url}/api/users/bulk", json=ids)
+
+def test_sparse_fieldsets(app_url, fill_test_data):
+    """Тест на выборку только запрошенных полей (fields) в списке, карточке и выгрузке."""
+    user_id = fill_test_data[-1]
+    response = requests.get(f"{app_url}/api/users/", params={"fields": "email,id", "size": 5})
+    assert response.status_code == 200, f"Fields failed with status code {response.status_code}"
+    assert all(set(user) == {"id", "email"} for user in response.json()["items"]), "Page returned extra fields"
+
+    params = {"cursor": user_id - 1, "limit": 2}
+    full = requests.get(f"{app_url}/api/users/", params=params).json()
+    data = requests.get(f"{app_url}/api/users/", params={**params, "fields": "email"}).json()
+    assert data["data"] == [{"email": user["email"]} for user in full["data"]], "Cursor page returned extra fields"
+    assert data["next_cursor"] == full["next_cursor"], "Cursor is wrong when id is not requested"
+
+    response = requests.get(f"{app_url}/api/users/{user_id}", params={"fields": "first_name"})
+    assert response.status_code == 200, f"Get with fields failed with status code {response.status_code}"
+    assert list(response.json()) == ["first_name"], "Get returned extra fields"
+
+    response = requests.get(f"{app_url}/api/users/export", params={"format": "csv", "fields": "id,email"})
+    assert response.text.splitlines()[0] == "id,email", "CSV header does not follow fields"
+    response = requests.get(f"{app_url}/api/users/export", params={"fields": "avatar"})
+    assert set(json.loads(response.text.splitlines()[0])) == {"avatar"}, "NDJSON row returned extra fields"
+
+    for path in ("/api/users/", f"/api/users/{user_id}", "/api/users/export"):
+        response = requests.get(f"{app_url}{path}", params={"fields": "id,password"})
+        assert response.status_code == 422, f"Unknown field was accepted by {path}"
+
+def test_conditional_requests(app_url):
+    """Тест ETag: 304 на If-None-Match, 412 на устаревший If-Match и смена ETag страницы после записи."""
+    payload = {"email": f"etag_{datetime.now().timestamp()}@example.com", "first_name": "Etag", "last_name": "User"}
+    created = requests.post(f"{app_url}/api/users/", json=payload)
+    user_id, etag = created.json()["id"], created.headers["ETag"]
+    url = f"{app_url}/api/users/{user_id}"
+
+    response = requests.get(url)
+    assert response.headers["ETag"] == etag, "GET and POST disagree on the ETag"
+    assert "version" not in response.json(), "Version leaked into the body"
+    response = requests.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304 and not response.content, "Unchanged user was sent again"
+
+    page_params = {"email": payload["email"]}
+    page = requests.get(f"{app_url}/api/users/", params=page_params)
+    page_etag = {"If-None-Match": page.headers["ETag"]}
+    for other in ({"fields": "email"}, {"size": 10}, {"page": 2}):
+        response = requests.get(f"{app_url}/api/users/", params={**page_params, **other}, headers=page_etag)
+        assert response.status_code == 200, f"Page ETag ignores {other}"
+    response = requests.get(url, params={"fields": "email"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag, "User ETag ignores fields"
+    response = requests.get(f"{app_url}/api/users/", params=page_params, headers=page_etag)
+    assert response.status_code == 304, "Unchanged page was sent again"
+
+    response = requests.patch(url, json={"first_name": "Fresh"}, headers={"If-Match": etag})
+    assert response.status_code == 200, f"Conditional patch failed with status code {response.status_code}"
+    assert response.headers["ETag"] != etag, "Patch did not change the ETag"
+    response = requests.patch(url, json={"first_name": "Stale"}, headers={"If-Match": etag})
+    assert response.status_code == 412, "Patch with a stale If-Match was applied"
+    assert requests.get(url, headers={"If-None-Match": etag}).json()["first_name"] == "Fresh"
+    response = requests.get(f"{app_url}/api/users/", params=page_params, headers=page_etag)
+    assert response.status_code == 200, "Page ETag did not change after a write"
+
+    assert requests.delete(url, headers={"If-Match": etag}).status_code == 412, "Stale delete was applied"
+    assert requests.delete(url, headers={"If-Match": requests.get(url).headers["ETag"]}).status_code == 204
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from app.database import cache, users as user_crud
+from app.database.cache import ExternalCache, LRUCache, NullCache, cache_from_env
+from app.models.User import UserCreate, UserResponse, UserUpdate
+from app.settings import CacheSettings
+
+
+def make_user(user_id: int) -> UserResponse:
+    return UserResponse(id=user_id, email=f"user{user_id}@example.com", first_name="Cache", last_name="User")
+
+
+class FakeClient:
+    """Локальная замена внешнего кеша с redis-подобным интерфейсом"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_lru_size_bound_and_ttl():
+    """Тест вытеснения по размеру и по времени жизни"""
+    lru = LRUCache(max_size=2, ttl=60)
+    for user_id in (1, 2, 3):
+        lru.set(user_id, make_user(user_id))
+    assert lru.get(1) is None
+    assert lru.get(3).id == 3
+    assert lru.stats()["evictions"] == 1
+
+    lru.ttl = 0
+    lru.set(4, make_user(4))
+    time.sleep(0.01)
+    assert lru.get(4) is None
+    assert (lru.hits, lru.misses, lru.evictions) == (1, 2, 3)
+
+
+def test_cache_from_settings(monkeypatch):
+    """Тест выбора кеша по настройкам USER_CACHE, USER_CACHE_SIZE и USER_CACHE_TTL"""
+    monkeypatch.setenv("USER_CACHE", "memory")
+    monkeypatch.setenv("USER_CACHE_SIZE", "5")
+    monkeypatch.setenv("USER_CACHE_TTL", "2.5")
+    lru = cache_from_env(CacheSettings())
+    assert isinstance(lru, LRUCache) and (lru.max_size, lru.ttl) == (5, 2.5)
+
+    monkeypatch.setenv("USER_CACHE", "none")
+    assert isinstance(cache_from_env(CacheSettings()), NullCache)
+    monkeypatch.setenv("USER_CACHE", "redis")
+    with pytest.raises(ValueError):
+        cache_from_env(CacheSettings())
+
+
+def test_stampede_guard_single_query():
+    """Тест: параллельные промахи по одному id выполняют один запрос"""
+    lru = LRUCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return make_user(1)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(lru.get_or_load(1, loader))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert [user.id for user in results] == [1] * 10
+
+
+def test_stampede_guard_shares_missing_user():
+    """Тест: отсутствие пользователя передается ожидающим потокам без повторных запросов"""
+    lru = LRUCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return None
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(lru.get_or_load(1, loader))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [None] * 10
+
+
+def test_async_stampede_guard_single_query():
+    """Тест: параллельные асинхронные промахи по одному id выполняют один запрос"""
+    lru = LRUCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return make_user(1)
+
+    async def scenario():
+        return await asyncio.gather(*(lru.aget_or_load(1, loader) for _ in range(10)))
+
+    assert [user.id for user in asyncio.run(scenario())] == [1] * 10
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("backend", [lambda: LRUCache(), lambda: ExternalCache(FakeClient())],
+                         ids=["memory", "external"])
+def test_writes_invalidate_cache(crud_db, monkeypatch, backend):
+    """Тест обновления и инвалидации кеша при записи"""
+    user_cache = backend()
+    monkeypatch.setattr(cache, "user_cache", user_cache)
+
+    user = user_crud.create_user(UserCreate(email="cached@example.com", first_name="Cached", last_name="User"))
+    assert user_crud.get_user(user.id).first_name == "Cached"
+    assert user_crud.get_user(user.id).first_name == "Cached"
+    assert (user_cache.hits, user_cache.misses) == (1, 1)
+
+    # Запись только сбрасывает кеш: иначе медленная параллельная запись могла бы сохранить старую версию
+    user_crud.update_user(user.id, UserUpdate(first_name="Updated"))
+    assert user_cache.get(user.id) is None
+    updated = user_crud.get_user(user.id)
+    assert (updated.first_name, updated.version) == ("Updated", 2)
+
+    user_crud.delete_user(user.id)
+    assert user_crud.get_user(user.id) is None
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from fastapi_pagination import Params
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.database import users as user_crud
+from app.database.engine import create_indexes
+from app.models.User import User, UserCreate, UserFilter
+
+NAMES = [("Janet", "Weaver"), ("Emma", "Wong"), ("Eve", "Holt"), ("Charles", "Morris"), ("Tracey", "Ramos"),
+         ("george", "bluth"), ("Rachel", "Howell"), ("Byron", "Fields"), ("Tobias", "Funke"), ("Lindsay", "Ferguson")]
+
+
+def engines():
+    yield pytest.param(None, id="sqlite")
+    yield pytest.param(os.getenv("DATABASE_ENGINE"), id="postgresql", marks=pytest.mark.skipif(
+        not os.getenv("DATABASE_ENGINE", "").startswith("postgresql"), reason="needs DATABASE_ENGINE=postgresql"))
+
+
+# Каждый тест выполняется на SQLite и, если задана, на PostgreSQL из DATABASE_ENGINE
+pytestmark = pytest.mark.parametrize("crud_db", list(engines()), indirect=True)
+
+
+@pytest.fixture
+def filter_db(crud_db):
+    """Фикстура с базой, созданной вместе с индексами"""
+    with crud_db.begin() as conn:
+        create_indexes(conn)
+    user_crud.create_users([UserCreate(email=f"{first.lower()}.{last.lower()}@reqres.in", first_name=first,
+                                       last_name=last) for first, last in NAMES])
+    return crud_db
+
+
+def page(user_filter, size=50):
+    return [(user["first_name"], user["last_name"])
+            for user in user_crud.get_users_page(Params(size=size), user_filter)["items"]]
+
+
+def test_filters_and_sorting(filter_db):
+    """Поиск по email, по префиксу фамилии/имени без учета регистра и сортировка."""
+    assert page(UserFilter(email="emma.wong@reqres.in")) == [("Emma", "Wong")]
+    assert page(UserFilter(last_name="w", sort=["last_name"])) == [("Janet", "Weaver"), ("Emma", "Wong")]
+    assert page(UserFilter(last_name="F", first_name="t", sort=["-first_name"])) == [("Tobias", "Funke")]
+    assert page(UserFilter(last_name="B")) == [("george", "bluth")]
+    assert page(UserFilter(last_name="100%")) == []
+    assert page(UserFilter(sort=["last_name"]), size=3) == [("george", "bluth"), ("Lindsay", "Ferguson"),
+                                                             ("Byron", "Fields")]
+    after = user_crud.get_users_after(None, 50, UserFilter(first_name="E"))
+    assert [user.first_name for user in after] == ["Emma", "Eve"]
+
+
+def test_prefix_match_non_ascii(filter_db):
+    """Поиск по префиксу кириллической фамилии и имени, в том числе со смешанным регистром."""
+    user_crud.create_users([UserCreate(email="ivan.ivanov@reqres.in", first_name="Иван", last_name="Иванов"),
+                            UserCreate(email="ivanka.trump@reqres.in", first_name="IVANKA", last_name="Иваненко")])
+    assert page(UserFilter(last_name="Иванов")) == [("Иван", "Иванов")]
+    assert page(UserFilter(last_name="Иван", sort=["last_name"])) == [("IVANKA", "Иваненко"), ("Иван", "Иванов")]
+    assert page(UserFilter(last_name="Ива", first_name="ivan")) == [("IVANKA", "Иваненко")]
+
+
+def test_prefix_match_last_code_point(filter_db):
+    """Префикс, оканчивающийся на U+10FFFF, не ломает построение диапазона."""
+    user_crud.create_users([UserCreate(email="max.one@reqres.in", first_name="Max", last_name="Z\U0010ffff\U0010ffffa"),
+                            UserCreate(email="max.two@reqres.in", first_name="Max", last_name="Za")])
+    assert page(UserFilter(last_name="Z\U0010ffff")) == [("Max", "Z\U0010ffff\U0010ffffa")]
+    assert page(UserFilter(first_name="\U0010ffff")) == []
+
+
+def explain(engine, query) -> str:
+    compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            return " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+        conn.execute(text("SET enable_seqscan = off"))
+        return " ".join(row[0] for row in conn.execute(text(f"EXPLAIN {compiled}")))
+
+
+@pytest.mark.parametrize("user_filter, index", [
+    (UserFilter(email="emma.wong@reqres.in"), "ix_user_email"),
+    (UserFilter(last_name="We"), "ix_user_name"),
+    (UserFilter(last_name="We", first_name="Ja"), "ix_user_name"),
+    (UserFilter(sort=["last_name", "first_name"]), "ix_user_name"),
+    (UserFilter(sort=["-email"]), "ix_user_email"),
+])
+def test_queries_use_indexes(filter_db, user_filter, index):
+    """EXPLAIN показывает, что фильтры и сортировка идут по индексам."""
+    query = user_crud.sort_users(user_crud.filter_users(select(User), user_filter, filter_db.dialect), user_filter)
+    assert index in explain(filter_db, query)
+
+
+def test_email_conflict_is_told_apart(crud_db):
+    """Только нарушение уникальности email считается конфликтом email, прочие ошибки целостности - нет."""
+    user_crud.create_users([UserCreate(email="twice@reqres.in", first_name="Twice", last_name="User")])
+    with pytest.raises(IntegrityError) as duplicate:
+        user_crud.create_users([UserCreate(email="twice@reqres.in", first_name="Again", last_name="User")])
+    assert user_crud.is_email_conflict(duplicate.value)
+
+    with pytest.raises(IntegrityError) as missing_name, Session(crud_db) as session:
+        session.exec(insert(User).values(email="nameless@reqres.in", first_name=None, last_name="User"))
+    assert not user_crud.is_email_conflict(missing_name.value)
@@ -0,0 +1,41 @@
+import pytest
+from voluptuous import MultipleInvalid
+
+from app.api.users_client import USER_LIST_SCHEMA, UserApiClient
+from app.schemas import validation
+
+
+def make_page(size):
+    users = [{"id": i, "email": f"user{i}@reqres.in", "first_name": "Janet", "last_name": "Weaver",
+              "avatar": None if i % 2 else f"https://reqres.in/img/faces/{i}-image.jpg"} for i in range(1, size + 1)]
+    return {"page": 1, "per_page": size, "total": size, "total_pages": 1, "data": users,
+            "support": {"url": "https://reqres.in/#support-heading", "text": "Support"}}
+
+
+def test_fast_path_matches_voluptuous():
+    """Быстрый путь возвращает тот же результат, что и voluptuous."""
+    payload = make_page(50)
+    assert USER_LIST_SCHEMA(payload) == USER_LIST_SCHEMA.schema(payload) == payload
+    assert validation.list_users(make_page(7)) == make_page(7)
+
+
+@pytest.mark.parametrize("broken", [
+    lambda page: page["data"][3].update(id="4"),
+    lambda page: page["data"][3].update(extra=True),
+    lambda page: page["data"][3].pop("email"),
+    lambda page: page.update(total="50"),
+    lambda page: page.update(data=[]),
+])
+def test_invalid_pages_raise_voluptuous_errors(broken):
+    """Невалидные данные отклоняются с ошибками voluptuous."""
+    payload = make_page(50)
+    broken(payload)
+    with pytest.raises(MultipleInvalid):
+        USER_LIST_SCHEMA(payload)
+
+
+def test_schemas_are_shared_between_clients():
+    """Схемы компилируются один раз на процесс, а не в каждом клиенте."""
+    first, second = UserApiClient("http://a"), UserApiClient("http://b")
+    assert first._user_list_schema is second._user_list_schema is USER_LIST_SCHEMA
+    assert first._user_schema is second._user_schema is validation.user
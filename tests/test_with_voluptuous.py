@@ -27,21 +27,15 @@ def test_users_data():
 @pytest.fixture(scope="module")
 def created_users(api_client, test_users_data):
     """Фикстура с созданными пользователями (удаляются после тестов)"""
-    users = []
-    for user_data in test_users_data:
-        try:
-            user = api_client.create_user(user_data)
-            users.append(user)
-        except HTTPError as e:
-            pytest.fail(f"Failed to create test user: {str(e)}")
+    try:
+        ids = api_client.create_users(test_users_data)["ids"]
+    except HTTPError as e:
+        pytest.fail(f"Failed to create test users: {str(e)}")
+    users = [{**user_data, "id": user_id} for user_data, user_id in zip(test_users_data, ids)]
 
     yield users
 
-    for user in users:
-        try:
-            api_client.delete_user(user["id"])
-        except HTTPError:
-            pass  # Пользователь уже удален
+    api_client.delete_users(ids)  # Уже удаленные пользователи попадут в missing
 
 
 def test_create_and_get_user(api_client):
@@ -127,4 +121,25 @@ def test_nonexistent_user_operations(api_client):
     # Удаление
     with pytest.raises(HTTPError) as exc_info:
         api_client.delete_user(non_existent_id)
-    assert exc_info.value.response.status_code == 404
\ No newline at end of file
+    assert exc_info.value.response.status_code == 404
+
+def test_get_users_many(api_client, created_users):
+    """Тест пакетного получения пользователей с сохранением порядка"""
+    ids = [user["id"] for user in reversed(created_users)] + [99999]
+
+    result = api_client.get_users_many(ids)
+    assert [user["id"] for user in result["data"]] == ids[:-1]
+    assert result["missing"] == [99999]
+
+    many_ids = ids * 30
+    result = api_client.get_users_many(many_ids)
+    assert [user["id"] for user in result["data"]] == [user_id for user_id in many_ids if user_id != 99999]
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_export_users(api_client, created_users, export_format):
+    """Тест потоковой выгрузки пользователей"""
+    exported = {int(user["id"]): user for user in api_client.export_users(export_format)}
+    for user in created_users:
+        assert exported[user["id"]]["email"] == user["email"]
+    assert list(exported) == sorted(exported)
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database import async_engine as async_engine_module, async_users, users as user_crud
+from app.database.coalescer import AsyncWriteCoalescer, WriteCoalescer
+from app.models.User import UserCreate
+
+EMAILS = ["taken@example.com", "one@example.com", "two@example.com", "one@example.com", "three@example.com"]
+
+
+def make_user(email: str) -> UserCreate:
+    return UserCreate(email=email, first_name="Group", last_name="Commit")
+
+
+@pytest.fixture
+def commits(crud_db):
+    """Фикстура с отдельной базой и счётчиком COMMIT"""
+    user_crud.create_user(make_user("taken@example.com"))
+    counter = []
+    event.listen(crud_db, "commit", lambda conn: counter.append(1))
+    return counter
+
+
+def test_concurrent_creates_share_one_commit(commits):
+    """Тест группового коммита: одна транзакция на пачку, ошибки дубликатов только у своих запросов"""
+    coalescer = WriteCoalescer(user_crud.create_user_group, max_batch=len(EMAILS), max_delay=1)
+    outcomes = [None] * len(EMAILS)
+
+    def submit(i):
+        try:
+            outcomes[i] = coalescer.submit(make_user(EMAILS[i]))
+        except IntegrityError as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(EMAILS))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(commits) == 1, "Batch was not committed in one transaction"
+    assert coalescer.stats()["batches"] == 1
+    failed = [EMAILS[i] for i, outcome in enumerate(outcomes) if isinstance(outcome, IntegrityError)]
+    created = [outcome for outcome in outcomes if not isinstance(outcome, IntegrityError)]
+    assert sorted(failed) == ["one@example.com", "taken@example.com"]
+    assert sorted(user.email for user in created) == ["one@example.com", "three@example.com", "two@example.com"]
+    assert len({user.id for user in created}) == 3
+    assert all(user_crud.get_user(user.id) == user for user in created)
+
+
+def test_lone_create_reports_conflict(commits):
+    """Тест одиночного запроса в пачке: дубликат email возвращается как ошибка"""
+    coalescer = WriteCoalescer(user_crud.create_user_group, max_delay=0)
+    user = coalescer.submit(make_user("lone@example.com"))
+    assert user.email == "lone@example.com"
+    with pytest.raises(IntegrityError):
+        coalescer.submit(make_user("lone@example.com"))
+
+
+def test_conflict_missed_by_check_falls_back_to_single_commits(commits, monkeypatch):
+    """Тест гонки: email занят после проверки, пачка повторяется по одному пользователю"""
+    monkeypatch.setattr(user_crud, "claim_emails", lambda rows, taken: [None] * len(rows))
+    outcomes = user_crud.create_user_group([make_user(email) for email in EMAILS[:3]])
+    assert isinstance(outcomes[0], IntegrityError)
+    assert [user.email for user in outcomes[1:]] == EMAILS[1:3]
+
+
+def test_async_coalescer_isolates_errors(tmp_path, monkeypatch):
+    """Тест асинхронного группового коммита с ошибкой в одном из запросов"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+    monkeypatch.setattr(async_engine_module, "async_replica_engines", [])
+    monkeypatch.setattr(async_users, "async_session",
+                        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    commits = []
+    event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        await async_users.create_user(make_user("taken@example.com"))
+        commits.clear()
+        coalescer = AsyncWriteCoalescer(async_users.create_user_group, max_batch=len(EMAILS), max_delay=1)
+        outcomes = await asyncio.gather(*(coalescer.submit(make_user(email)) for email in EMAILS),
+                                        return_exceptions=True)
+        await engine.dispose()
+        return outcomes
+
+    outcomes = asyncio.run(scenario())
+    assert len(commits) == 1, "Batch was not committed in one transaction"
+    failed = [EMAILS[i] for i, outcome in enumerate(outcomes) if isinstance(outcome, IntegrityError)]
+    assert sorted(failed) == ["one@example.com", "taken@example.com"]
+    assert len({outcome.id for outcome in outcomes if not isinstance(outcome, IntegrityError)}) == 3